@@ -0,0 +1,64 @@
+"""
+Benchmarks how the training time of ``train_model`` scales with the number
+of local worker processes of distributed training. One worker trains in the
+calling process. The train set is written to temporary Parquet files, as
+the workers read their rows from Parquet, and the time of each run includes
+starting the workers and reading their rows.
+
+Run it from the project root with:
+    python src/benchmarks/bench_distributed_training.py --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from minipro.pipelines.data_science.nodes import train_model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed training benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--n-rows", type=int, default=2000000)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(42)
+    x = pd.DataFrame(
+        rng.normal(size=(args.n_rows, 13)), columns=["f%d" % i for i in range(13)]
+    )
+    y = (x["f0"] * x["f1"] + rng.normal(scale=0.1, size=len(x))).to_frame(
+        "nb_pocket_ice_over_area"
+    )
+    params = {
+        "n_estimators": args.n_estimators,
+        "max_depth": 7,
+        "learning_rate": 0.1,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8,
+        "n_jobs": args.n_jobs,
+    }
+
+    timings = {}
+    for n_workers in args.workers:
+        start = time.perf_counter()
+        train_model(x, y, dict(params, n_workers=n_workers))
+        timings[n_workers] = time.perf_counter() - start
+
+    print(
+        "%d rows, %d trees, %d threads in total"
+        % (args.n_rows, args.n_estimators, args.n_jobs)
+    )
+    print("%-8s %12s %10s" % ("workers", "time (s)", "speedup"))
+    for n_workers, seconds in timings.items():
+        print(
+            "%-8d %12.2f %10.2f"
+            % (n_workers, seconds, timings[args.workers[0]] / seconds)
+        )
+
+
+if __name__ == "__main__":
+    main()
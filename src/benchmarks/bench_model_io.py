@@ -0,0 +1,85 @@
+"""
+Benchmarks the load time of the trained model saved with the pickle backend
+against the native XGBoost format of ``XGBoostModelDataSet``.
+
+Run it from the project root with:
+    python src/benchmarks/bench_model_io.py --n-estimators 1000
+"""
+import argparse
+import pickle
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from minipro.extras.datasets.xgboost_dataset import XGBoostModelDataSet
+
+
+def _time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Model artifact load benchmark")
+    parser.add_argument("--n-estimators", type=int, default=1000)
+    parser.add_argument("--max-depth", type=int, default=7)
+    parser.add_argument("--n-rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(42)
+    x = pd.DataFrame(
+        rng.normal(size=(args.n_rows, 12)), columns=["f%d" % i for i in range(12)]
+    )
+    y = x["f0"] * x["f1"] + rng.normal(scale=0.1, size=len(x))
+    model = xgb.XGBRegressor(
+        n_estimators=args.n_estimators, max_depth=args.max_depth
+    ).fit(x, y)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = Path(tmp_dir) / "model.pkl"
+        with open(pickle_path, "wb") as f:
+            pickle.dump(model, f)
+
+        def load_pickle():
+            with open(pickle_path, "rb") as f:
+                return pickle.load(f)
+
+        results = {"pickle": (_time(load_pickle, args.repeat), pickle_path)}
+        for suffix in (".ubj", ".json"):
+            dataset = XGBoostModelDataSet(str(Path(tmp_dir) / ("model" + suffix)))
+            dataset.save(model)
+            results[suffix[1:]] = (
+                _time(dataset.load, args.repeat),
+                Path(tmp_dir) / ("model" + suffix),
+            )
+        metadata = XGBoostModelDataSet(str(Path(tmp_dir) / "model.ubj"))
+        results["ubj metadata"] = (
+            _time(metadata.load_metadata, args.repeat),
+            Path(tmp_dir) / "model.ubj.meta.json",
+        )
+
+        expected = model.predict(x.head(1000))
+        reloaded = XGBoostModelDataSet(str(Path(tmp_dir) / "model.ubj")).load()
+        np.testing.assert_allclose(reloaded.predict(x.head(1000)), expected)
+
+        print("%d trees of depth %d" % (args.n_estimators, args.max_depth))
+        print("%-14s %12s %12s" % ("format", "load (ms)", "size (MB)"))
+        for name, (seconds, path) in results.items():
+            print(
+                "%-14s %12.1f %12.2f"
+                % (name, seconds * 1000, path.stat().st_size / 2 ** 20)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmarks the write time, read time and file size of the cloud tables
+(P_clouds and the train and test sets) under each Parquet storage profile of
+``conf/base/catalog.yml`` (the "_parquet_*" entries), against the default
+pandas settings, with and without dictionary encoding. The tables of
+``data/`` are used when they exist, synthetic cloud tables otherwise.
+
+Run it from the project root with:
+    python src/benchmarks/bench_parquet_profiles.py
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from minipro.pipelines.data_engineering.nodes import split_data
+from minipro.pipelines.data_preparation.nodes import COL_NAMES
+
+DATASETS = [
+    "P_clouds",
+    "P_clouds_trn_x",
+    "P_clouds_trn_y",
+    "P_clouds_tst_x",
+    "P_clouds_tst_y",
+]
+
+
+def _synthetic_clouds(n_rows: int) -> pd.DataFrame:
+    """
+    Cloud table with the columns of P_clouds and realistic value ranges
+    """
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(
+        rng.lognormal(size=(n_rows, len(COL_NAMES))).round(4), columns=COL_NAMES
+    )
+    df["month"] = rng.integers(1, 13, n_rows)
+    df["lat"] = rng.uniform(-70, -40, n_rows).round(3)
+    df["lon"] = rng.uniform(-60, 60, n_rows).round(3)
+    df["ctt"] = rng.normal(250, 10, n_rows).round(2)
+    return df
+
+
+def _load_tables(catalog: dict, n_rows: int) -> dict:
+    # The train set is written through transcoded "@pandas" entries
+    paths = {
+        name: Path(catalog.get(name, catalog.get(name + "@pandas"))["filepath"])
+        for name in DATASETS
+    }
+    if all(path.exists() for path in paths.values()):
+        return {name: pd.read_parquet(path) for name, path in paths.items()}
+    print("Cloud tables not found in data/, using %d synthetic rows" % n_rows)
+    p_clouds = _synthetic_clouds(n_rows)
+    split = split_data(p_clouds, 0.15, ["nb_pocket_ice_over_area"])
+    return {
+        "P_clouds": p_clouds,
+        "P_clouds_trn_x": split["x_trn"],
+        "P_clouds_trn_y": split["y_trn"],
+        "P_clouds_tst_x": split["x_tst"],
+        "P_clouds_tst_y": split["y_tst"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parquet storage profile benchmark")
+    parser.add_argument("--catalog", default="conf/base/catalog.yml")
+    parser.add_argument("--n-rows", type=int, default=2000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with open(args.catalog, "r", encoding="utf-8") as f:
+        catalog = yaml.safe_load(f)
+    profiles = {"default": {}}
+    profiles.update(
+        {
+            name[len("_parquet_") :]: entry.get("save_args", {})
+            for name, entry in catalog.items()
+            if name.startswith("_parquet_")
+        }
+    )
+    tables = _load_tables(catalog, args.n_rows)
+
+    print(
+        "%-16s %-10s %-10s %12s %12s %12s"
+        % ("dataset", "profile", "dictionary", "write (s)", "read (s)", "size (MB)")
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, df in tables.items():
+            for profile, save_args in profiles.items():
+                for use_dictionary in (True, False):
+                    path = Path(tmp_dir) / (
+                        "%s_%s_%d.parquet" % (name, profile, use_dictionary)
+                    )
+                    writes, reads = [], []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        df.to_parquet(
+                            path, **dict(save_args, use_dictionary=use_dictionary)
+                        )
+                        writes.append(time.perf_counter() - start)
+                        start = time.perf_counter()
+                        pd.read_parquet(path)
+                        reads.append(time.perf_counter() - start)
+                    print(
+                        "%-16s %-10s %-10s %12.3f %12.3f %12.2f"
+                        % (
+                            name,
+                            profile,
+                            "on" if use_dictionary else "off",
+                            statistics.median(writes),
+                            statistics.median(reads),
+                            path.stat().st_size / 2 ** 20,
+                        )
+                    )
+
+
+if __name__ == "__main__":
+    main()
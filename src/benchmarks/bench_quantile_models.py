@@ -0,0 +1,81 @@
+"""
+Benchmarks the extra cost of the quantile regression model: the training
+time of ``train_model`` alone and followed by ``train_quantile_model``, and
+the time to predict a test set with the mean model alone and with the mean model and all
+quantiles of the quantile model (one call per chunk for each model).
+
+Run it from the project root with:
+    python src/benchmarks/bench_quantile_models.py --quantiles 0.1 0.5 0.9
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from minipro.pipelines.data_science.nodes import train_model, train_quantile_model
+
+
+def _predict(x: pd.DataFrame, models: list, chunk_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(x), chunk_size):
+        df_chunk = x.iloc[i : i + chunk_size]
+        for model in models:
+            model.predict(df_chunk)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantile model benchmark")
+    parser.add_argument("--quantiles", type=float, nargs="+", default=[0.1, 0.5, 0.9])
+    parser.add_argument("--n-rows", type=int, default=1000000)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--n-jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(42)
+    x = pd.DataFrame(
+        rng.normal(size=(args.n_rows, 13)), columns=["f%d" % i for i in range(13)]
+    )
+    y = (x["f0"] * x["f1"] + rng.normal(scale=0.1, size=len(x))).to_frame(
+        "nb_pocket_ice_over_area"
+    )
+    params = {
+        "n_estimators": args.n_estimators,
+        "max_depth": 7,
+        "learning_rate": 0.1,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8,
+        "n_jobs": args.n_jobs,
+    }
+
+    start = time.perf_counter()
+    model = train_model(x, y, params)["model"]
+    train_mean = time.perf_counter() - start
+    start = time.perf_counter()
+    quantile_model = train_quantile_model(x, y, dict(params, quantiles=args.quantiles))
+    train_all = train_mean + time.perf_counter() - start
+
+    predict_mean = _predict(x, [model], args.chunk_size)
+    predict_all = _predict(x, [model, quantile_model], args.chunk_size)
+
+    print(
+        "%d rows, %d trees, %d threads, quantiles %s"
+        % (args.n_rows, args.n_estimators, args.n_jobs, args.quantiles)
+    )
+    print("%-22s %12s %12s %8s" % ("", "mean (s)", "+ quantiles", "ratio"))
+    for name, mean, total in [
+        ("training", train_mean, train_all),
+        ("inference", predict_mean, predict_all),
+    ]:
+        print("%-22s %12.2f %12.2f %8.2f" % (name, mean, total, total / mean))
+    print(
+        "%-22s %12.0f %12.0f"
+        % ("inference rows/s", len(x) / predict_mean, len(x) / predict_all)
+    )
+
+
+if __name__ == "__main__":
+    main()
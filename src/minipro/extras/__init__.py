@@ -0,0 +1 @@
+"""Custom extensions of the project"""
@@ -0,0 +1,47 @@
+""" Dataset loading Parquet files lazily, as handles on their rows """
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict
+
+from kedro.io import AbstractDataSet, DataSetError
+
+from minipro.extras.parquet import ParquetTable
+
+
+class ParquetTableDataSet(AbstractDataSet):
+    """
+    Loads a local Parquet file as a ``ParquetTable``, which only reads the
+    footer of the file until ranges of rows are asked for. It is read-only:
+    the file is written through a ``pandas.ParquetDataSet`` entry of the same
+    file, with Kedro transcoding.
+
+    Example catalog entries:
+        P_clouds_trn_x@pandas:
+          type: pandas.ParquetDataSet
+          filepath: "data/03_primary/clouds_trn_x.parquet"
+
+        P_clouds_trn_x@table:
+          type: minipro.extras.datasets.parquet_dataset.ParquetTableDataSet
+          filepath: "data/03_primary/clouds_trn_x.parquet"
+    """
+
+    def __init__(self, filepath: str):
+        """
+        Args:
+            filepath: Path to a local Parquet file
+        """
+        self._filepath = PurePosixPath(filepath)
+
+    def _describe(self) -> Dict[str, Any]:
+        return dict(filepath=self._filepath)
+
+    def _exists(self) -> bool:
+        return Path(self._filepath).exists()
+
+    def _load(self) -> ParquetTable:
+        return ParquetTable(str(self._filepath))
+
+    def _save(self, data: Any) -> None:
+        raise DataSetError(
+            "ParquetTableDataSet is read-only, save '%s' with a pandas.ParquetDataSet"
+            % self._filepath
+        )
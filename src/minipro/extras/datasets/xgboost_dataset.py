@@ -0,0 +1,96 @@
+""" Dataset saving XGBoost models in the native XGBoost format """
+import json
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict
+
+import xgboost as xgb
+from kedro.io import AbstractDataSet, DataSetError
+
+from minipro.extras.quantiles import quantile_levels
+
+
+class XGBoostModelDataSet(AbstractDataSet):
+    """
+    Saves and loads a trained ``XGBRegressor`` in the native XGBoost format
+    (UBJSON for a ``.ubj`` file, JSON for a ``.json`` file) instead of
+    pickling the whole scikit-learn wrapper. The file does not depend on the
+    Python or scikit-learn version, and is parsed directly by XGBoost.
+
+    A metadata file ``<filepath>.meta.json`` is written next to the model
+    with the feature names, the hyperparameters, the number of trees, the
+    quantiles of a quantile regression model and the hash of the training
+    data. ``load_metadata`` reads it without parsing the booster, while
+    loading the dataset parses the booster and restores the hyperparameters
+    from it.
+
+    Example catalog entry:
+        model:
+          type: minipro.extras.datasets.xgboost_dataset.XGBoostModelDataSet
+          filepath: "data/07_model_output/model.ubj"
+          load_args:
+            n_jobs: 8
+    """
+
+    def __init__(self, filepath: str, load_args: Dict[str, Any] = None):
+        """
+        Args:
+            filepath: Path to the model file, with a ``.ubj`` or ``.json``
+            suffix that selects the format
+            load_args: Parameters set on the regressor after loading, e.g.
+            ``n_jobs`` to control the number of prediction threads
+        """
+        self._filepath = PurePosixPath(filepath)
+        if self._filepath.suffix not in (".ubj", ".json"):
+            raise DataSetError(
+                "XGBoostModelDataSet only supports .ubj and .json files, "
+                "got '%s'" % filepath
+            )
+        # The suffix of the model is kept, so that model.ubj and model.json
+        # in the same folder do not share their metadata file
+        self._metadata_filepath = PurePosixPath(str(self._filepath) + ".meta.json")
+        self._load_args = load_args or {}
+
+    def _describe(self) -> Dict[str, Any]:
+        return dict(filepath=self._filepath, load_args=self._load_args)
+
+    def _exists(self) -> bool:
+        return Path(self._filepath).exists()
+
+    def load_metadata(self) -> Dict[str, Any]:
+        """
+        Reads the metadata file written along with the model
+        Returns:
+            A dictionary with the feature names, the hyperparameters, the
+            number of trees and the hash of the training data
+        """
+        with open(self._metadata_filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load(self) -> xgb.sklearn.XGBRegressor:
+        model = xgb.XGBRegressor()
+        model.load_model(str(self._filepath))
+        # The native format does not keep the hyperparameters of the
+        # regressor, they are restored from the metadata file
+        if Path(self._metadata_filepath).exists():
+            params = self.load_metadata()["params"]
+            model.set_params(**{k: v for k, v in params.items() if v is not None})
+        if self._load_args:
+            model.set_params(**self._load_args)
+        return model
+
+    def _save(self, model: xgb.sklearn.XGBRegressor) -> None:
+        Path(self._filepath).parent.mkdir(parents=True, exist_ok=True)
+        model.save_model(str(self._filepath))
+
+        booster = model.get_booster()
+        metadata = {
+            "xgboost_version": xgb.__version__,
+            "feature_names": booster.feature_names,
+            "feature_types": booster.feature_types,
+            "params": model.get_xgb_params(),
+            "num_trees": booster.num_boosted_rounds(),
+            "quantiles": quantile_levels(model),
+            "training_data_hash": booster.attr("training_data_hash"),
+        }
+        with open(self._metadata_filepath, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, default=str)
@@ -0,0 +1,102 @@
+""" Lazy access to the rows of a Parquet file """
+from typing import Iterator, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class ParquetTable:
+    """
+    Handle on a Parquet file that reads ranges of rows on demand. Only the
+    footer of the file is read when the handle is created, and a range of
+    rows is read from the row groups that hold it, so a process can work on
+    its share of a table that does not fit in its memory. The handle only
+    holds the path and the layout of the file, so it can be sent to worker
+    processes.
+    """
+
+    def __init__(self, filepath: str):
+        """
+        Args:
+            filepath: Path to a local Parquet file, written by pandas
+        """
+        self.filepath = str(filepath)
+        parquet_file = pq.ParquetFile(self.filepath)
+        self.row_group_sizes = [
+            parquet_file.metadata.row_group(i).num_rows
+            for i in range(parquet_file.num_row_groups)
+        ]
+        self.columns = list(parquet_file.schema_arrow.empty_table().to_pandas().columns)
+        # pandas saves a range index as metadata, which only applies to the
+        # whole table, so the index of a range of rows is rebuilt from it
+        index_columns = (parquet_file.schema_arrow.pandas_metadata or {}).get(
+            "index_columns", []
+        )
+        self._range_index = next(
+            (
+                index
+                for index in index_columns
+                if isinstance(index, dict) and index["kind"] == "range"
+            ),
+            None,
+        )
+
+    def __len__(self) -> int:
+        return sum(self.row_group_sizes)
+
+    def read(
+        self, start: int = 0, stop: int = None, columns: List[str] = None
+    ) -> pd.DataFrame:
+        """
+        Reads a range of rows
+        Args:
+            start: Index of the first row to read
+            stop: Index after the last row to read, defaults to the end
+            columns: Columns to read, defaults to all columns
+        Returns:
+            A dataframe with the rows from start to stop
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        parquet_file = pq.ParquetFile(self.filepath)
+        tables, offset = [], 0
+        for i, size in enumerate(self.row_group_sizes):
+            if offset < stop and offset + size > start:
+                first = max(start - offset, 0)
+                table = parquet_file.read_row_group(
+                    i, columns=columns, use_pandas_metadata=True
+                )
+                tables.append(table.slice(first, min(stop - offset, size) - first))
+            offset += size
+        if not tables:
+            df = parquet_file.schema_arrow.empty_table().to_pandas()
+            return df if columns is None else df[columns]
+        return self._with_index(pa.concat_tables(tables).to_pandas(), start)
+
+    def iter_row_groups(self, columns: List[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Reads the rows one row group at a time
+        Args:
+            columns: Columns to read, defaults to all columns
+        Returns:
+            An iterator over the dataframes of the row groups, in order
+        """
+        parquet_file = pq.ParquetFile(self.filepath)
+        offset = 0
+        for i, size in enumerate(self.row_group_sizes):
+            table = parquet_file.read_row_group(
+                i, columns=columns, use_pandas_metadata=True
+            )
+            yield self._with_index(table.to_pandas(), offset)
+            offset += size
+
+    def _with_index(self, df: pd.DataFrame, start: int) -> pd.DataFrame:
+        if self._range_index is not None:
+            first = self._range_index["start"] + start * self._range_index["step"]
+            df.index = pd.RangeIndex(
+                first,
+                first + len(df) * self._range_index["step"],
+                self._range_index["step"],
+                name=self._range_index["name"],
+            )
+        return df
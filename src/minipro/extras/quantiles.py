@@ -0,0 +1,21 @@
+""" Helpers for XGBoost quantile regression models """
+import json
+from typing import List
+
+import xgboost as xgb
+
+
+def quantile_levels(model: xgb.sklearn.XGBRegressor) -> List[float]:
+    """
+    Reads the quantiles predicted by a quantile regression model from its
+    booster configuration, which is kept when the model is saved and loaded
+    Args:
+        model: A trained XGBoost regression model
+    Returns:
+        The quantiles predicted by the model, one per output, or an empty list
+        if it is not a quantile regression model
+    """
+    objective = json.loads(model.get_booster().save_config())["learner"]["objective"]
+    if objective["name"] != "reg:quantileerror":
+        return []
+    return json.loads(objective["quantile_loss_param"]["quantile_alpha"])
@@ -27,15 +27,31 @@
 # limitations under the License.
 
 """Project hooks."""
+import os
 from typing import Any, Dict, Iterable, Optional
 
 from kedro.config import ConfigLoader
 from kedro.framework.hooks import hook_impl
-from kedro.io import DataCatalog
+from kedro.io import AbstractDataSet, DataCatalog
+from kedro.pipeline import Pipeline
+from kedro.pipeline.node import Node
 from kedro.versioning import Journal
 
+from minipro.pipelines.data_preparation.pipeline import (
+    partition_catalog,
+    pipeline_partitions,
+)
+from minipro.profiling import NodeProfiler
+
+# Set this environment variable to 1 to profile each node of a run
+PROFILE_ENV_VAR = "MINIPRO_PROFILE"
+
 
 class ProjectHooks:
+    def __init__(self):
+        self._profiler = None
+        self._partition_template = None
+
     @hook_impl
     def register_config_loader(
         self,
@@ -54,6 +70,51 @@ class ProjectHooks:
         save_version: str,
         journal: Journal,
     ) -> DataCatalog:
+        # The config loader drops the "_" template entries of the catalog, so
+        # the partitions take the storage profile of the P_clouds entry
+        self._partition_template = (catalog or {}).get("P_clouds")
         return DataCatalog.from_config(
             catalog, credentials, load_versions, save_version, journal
         )
+
+    @hook_impl
+    def before_pipeline_run(
+        self, run_params: Dict[str, Any], pipeline: Pipeline, catalog: DataCatalog
+    ) -> None:
+        # Persist the preprocessed partitions of the pipeline, the entries of
+        # conf/ take precedence over the generated ones
+        entries = partition_catalog(
+            pipeline_partitions(pipeline), template=self._partition_template
+        )
+        for name, config in entries.items():
+            if name not in catalog.list():
+                catalog.add(name, AbstractDataSet.from_config(name, config))
+
+        params = (
+            catalog.load("params:profiling")
+            if "params:profiling" in catalog.list()
+            else {}
+        )
+        if params.get("enabled") or os.environ.get(PROFILE_ENV_VAR) == "1":
+            self._profiler = NodeProfiler(
+                params.get("output_dir", "logs/profiles"),
+                params.get("interval_ms", 5) / 1000,
+            )
+
+    @hook_impl
+    def before_node_run(self, node: Node, run_id: str) -> None:
+        # Nodes run by ParallelRunner do not go through before_pipeline_run
+        if self._profiler is None and os.environ.get(PROFILE_ENV_VAR) == "1":
+            self._profiler = NodeProfiler()
+        if self._profiler is not None:
+            self._profiler.start(node.name)
+
+    @hook_impl
+    def after_node_run(self, node: Node, run_id: str) -> None:
+        if self._profiler is not None:
+            self._profiler.stop(node.name, run_id)
+
+    @hook_impl
+    def on_node_error(self, node: Node, run_id: str) -> None:
+        if self._profiler is not None:
+            self._profiler.stop(node.name, run_id)
@@ -0,0 +1,34 @@
+"""Project parameters read outside of the nodes
+
+The data preparation and data analysis pipelines have one node per partition
+of the archive, listed from the raw_data_dir_mps parameter, but the pipeline
+registry runs before the parameters are available to the nodes, so it reads
+them with this module.
+"""
+from typing import Any, Dict, Iterable
+
+# Configuration folders, relative to the project root
+CONF_PATHS = ("conf/base", "conf/local")
+
+
+def load_parameters(conf_paths: Iterable[str] = None) -> Dict[str, Any]:
+    """
+    Reads the parameters of the project
+    Args:
+        conf_paths: Configuration folders holding the parameters. Defaults to
+        the parameters of the current Kedro session, which take the
+        environment (--env) and the extra parameters (--params) of the run
+        into account, or to CONF_PATHS outside of a session
+    Returns:
+        The merged parameters of the configuration folders
+    """
+    # pylint: disable=import-outside-toplevel
+    from kedro.config import ConfigLoader
+    from kedro.framework.session import get_current_session
+
+    if conf_paths is None:
+        session = get_current_session(silent=True)
+        if session is not None:
+            return session.load_context().params
+        conf_paths = CONF_PATHS
+    return ConfigLoader(list(conf_paths)).get("parameters*", "parameters*/**")
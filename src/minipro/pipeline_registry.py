@@ -4,6 +4,7 @@ from kedro.pipeline import Pipeline
 from minipro.pipelines import data_preparation as dp
 from minipro.pipelines import data_engineering as de
 from minipro.pipelines import data_science as ds
+from minipro.pipelines import data_analysis as da
 
 
 def register_pipelines() -> Dict[str, Pipeline]:
@@ -12,12 +13,19 @@ def register_pipelines() -> Dict[str, Pipeline]:
     Returns:
         A mapping from a pipeline name to a pipeline object.
     """
-    data_preparation_pipeline = dp.create_pipeline()
+    # The partitions are listed from the parameters of the run, and the
+    # project hooks add their datasets to the catalog of the run
+    partitions = dp.archive_partitions()
+    data_preparation_pipeline = dp.create_pipeline(partitions)
     data_engineering_pipeline = de.create_pipeline()
     data_science_pipeline = ds.create_pipeline()
+    quantile_pipeline = ds.create_pipeline(quantiles=True)
+    data_analysis_pipeline = da.create_pipeline(partitions)
     return {
         "dp": data_preparation_pipeline,
         "de": data_engineering_pipeline,
         "ds": data_science_pipeline,
+        "ds_quantiles": quantile_pipeline,
+        "da": data_analysis_pipeline,
         "__default__": data_science_pipeline,
     }
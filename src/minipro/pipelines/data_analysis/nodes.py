@@ -0,0 +1,228 @@
+""" Nodes for the data analysis pipeline """
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence, Tuple
+
+
+class GridAccumulator:
+    """
+    Running statistics of columns of the cloud data over a lat/lon/month grid.
+    For each cell and column it keeps the count, the mean, the sum of squared
+    deviations from the mean and a fixed-bin histogram used as a quantile
+    sketch. All of them are computed with ``np.bincount`` over the flat cell
+    index, and two accumulators can be merged, so the grid can be built one
+    chunk or one partition at a time.
+    """
+
+    def __init__(
+        self,
+        lat_range: Tuple[float, float],
+        lon_range: Tuple[float, float],
+        lat_step: float,
+        lon_step: float,
+        columns: Dict[str, Tuple[float, float]],
+        sketch_bins: int = 32,
+    ):
+        """
+        Args:
+            lat_range: Lower and upper latitude of the grid
+            lon_range: Lower and upper longitude of the grid
+            lat_step: Latitude size of a cell, in degrees
+            lon_step: Longitude size of a cell, in degrees
+            columns: Mapping from the name of a column to aggregate to the
+            range of its quantile sketch
+            sketch_bins: Number of bins of the quantile sketch of each column
+        """
+        self.lat_range = lat_range
+        self.lon_range = lon_range
+        self.lat_step = lat_step
+        self.lon_step = lon_step
+        self.columns = dict(columns)
+        self.sketch_bins = sketch_bins
+        self.n_lat = int(np.ceil((lat_range[1] - lat_range[0]) / lat_step))
+        self.n_lon = int(np.ceil((lon_range[1] - lon_range[0]) / lon_step))
+        self.n_cells = self.n_lat * self.n_lon * 12
+
+        shape = (len(self.columns), self.n_cells)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.sketch = np.zeros(
+            (len(self.columns), self.n_cells, sketch_bins), dtype=np.int32
+        )
+
+    def _cells(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Computes the flat cell index of each row, -1 for rows outside the grid
+        """
+        lat_bin = np.floor((df["lat"].to_numpy() - self.lat_range[0]) / self.lat_step)
+        lon_bin = np.floor((df["lon"].to_numpy() - self.lon_range[0]) / self.lon_step)
+        month = df["month"].to_numpy()
+        inside = (
+            (lat_bin >= 0)
+            & (lat_bin < self.n_lat)
+            & (lon_bin >= 0)
+            & (lon_bin < self.n_lon)
+            & (month >= 1)
+            & (month <= 12)
+        )
+        cells = (lat_bin * self.n_lon + lon_bin) * 12 + (month - 1)
+        return np.where(inside, cells, -1).astype(np.int64)
+
+    def update(self, df: pd.DataFrame) -> "GridAccumulator":
+        """
+        Adds the rows of a dataframe to the grid
+        Args:
+            df: Cloud data with the "lat", "lon" and "month" columns and the
+            columns to aggregate
+        Returns:
+            The accumulator itself
+        """
+        other = GridAccumulator(
+            self.lat_range,
+            self.lon_range,
+            self.lat_step,
+            self.lon_step,
+            self.columns,
+            self.sketch_bins,
+        )
+        cells = other._cells(df)
+        for i, (column, (low, high)) in enumerate(self.columns.items()):
+            values = df[column].to_numpy(dtype=np.float64)
+            valid = (cells >= 0) & ~np.isnan(values)
+            cell, value = cells[valid], values[valid]
+
+            count = np.bincount(cell, minlength=self.n_cells)
+            total = np.bincount(cell, weights=value, minlength=self.n_cells)
+            mean = np.divide(total, count, out=np.zeros(self.n_cells), where=count > 0)
+            m2 = np.bincount(
+                cell, weights=(value - mean[cell]) ** 2, minlength=self.n_cells
+            )
+            bins = np.clip(
+                ((value - low) / (high - low) * self.sketch_bins).astype(np.int64),
+                0,
+                self.sketch_bins - 1,
+            )
+            sketch = np.bincount(
+                cell * self.sketch_bins + bins,
+                minlength=self.n_cells * self.sketch_bins,
+            ).reshape(self.n_cells, self.sketch_bins)
+
+            other.count[i], other.mean[i], other.m2[i] = count, mean, m2
+            other.sketch[i] = sketch
+        return self.merge(other)
+
+    def merge(self, other: "GridAccumulator") -> "GridAccumulator":
+        """
+        Merges the statistics of another accumulator with the same grid into
+        this one (parallel variant of Welford's algorithm)
+        Args:
+            other: Accumulator to merge
+        Returns:
+            The accumulator itself
+        """
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        safe_count = np.maximum(count, 1)
+        self.mean = self.mean + delta * other.count / safe_count
+        self.m2 = (
+            self.m2 + other.m2 + delta ** 2 * self.count * other.count / safe_count
+        )
+        self.count = count
+        self.sketch += other.sketch
+        return self
+
+    def _quantile(self, i: int, cells: np.ndarray, q: float) -> np.ndarray:
+        """
+        Estimates a quantile of a column in some cells from its sketch, by
+        linear interpolation inside the bin that holds the quantile
+        """
+        low, high = self.columns[list(self.columns)[i]]
+        sketch = self.sketch[i, cells].astype(np.float64)
+        cumulative = np.cumsum(sketch, axis=1)
+        target = q * cumulative[:, -1:]
+        bins = np.minimum((cumulative < target).sum(axis=1), self.sketch_bins - 1)
+        rows = np.arange(len(cells))
+        below = np.where(bins > 0, cumulative[rows, bins - 1], 0.0)
+        in_bin = sketch[rows, bins]
+        fraction = np.divide(
+            target[:, 0] - below, in_bin, out=np.zeros(len(cells)), where=in_bin > 0
+        )
+        width = (high - low) / self.sketch_bins
+        return low + (bins + fraction) * width
+
+    def to_frame(self, quantiles: Sequence[float] = ()) -> pd.DataFrame:
+        """
+        Converts the statistics of the non-empty cells into a dataframe
+        Args:
+            quantiles: Quantiles to estimate for each column, e.g. 0.5
+        Returns:
+            A dataframe with one row per non-empty cell: the "lat" and "lon"
+            of its center, its "month" and, for each column, its
+            "<column>_count", "<column>_mean", "<column>_var" and
+            "<column>_q<percent>" values
+        """
+        cells = np.flatnonzero(self.count.sum(axis=0))
+        lat_bin, rest = np.divmod(cells, self.n_lon * 12)
+        lon_bin, month = np.divmod(rest, 12)
+        data = {
+            "lat": self.lat_range[0] + (lat_bin + 0.5) * self.lat_step,
+            "lon": self.lon_range[0] + (lon_bin + 0.5) * self.lon_step,
+            "month": month + 1,
+        }
+        for i, column in enumerate(self.columns):
+            count = self.count[i, cells]
+            data[column + "_count"] = count
+            data[column + "_mean"] = np.where(count > 0, self.mean[i, cells], np.nan)
+            data[column + "_var"] = np.divide(
+                self.m2[i, cells],
+                count - 1,
+                out=np.full(len(cells), np.nan),
+                where=count > 1,
+            )
+            for q in quantiles:
+                data["%s_q%d" % (column, round(q * 100))] = np.where(
+                    count > 0, self._quantile(i, cells, q), np.nan
+                )
+        return pd.DataFrame(data)
+
+
+def _chunks(df: pd.DataFrame, chunk_size: int) -> List[pd.DataFrame]:
+    return [df.iloc[i : i + chunk_size] for i in range(0, len(df), chunk_size)]
+
+
+def build_climatology(params: Dict, *partitions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates cloud-object features onto a lat/lon/month grid: count, mean,
+    variance and quantiles of each configured column in each cell. The
+    partitions of the archive are aggregated one chunk at a time and merged,
+    so the whole table never has to be held in memory at once.
+    Args:
+        params: Grid definition, columns to aggregate with the range of their
+        quantile sketch, quantiles to estimate and chunk size
+        partitions: Preprocessed partitions of the archive
+    Returns:
+        A gridded dataframe with one row per non-empty cell
+    Raises:
+        ValueError: If there are no partitions, i.e. the folder of the MPS
+        data files is missing or empty
+    """
+    if not partitions:
+        raise ValueError(
+            "No partitions to aggregate, the folder of the MPS data files "
+            "(raw_data_dir_mps) is missing or has no data files"
+        )
+    accumulator = GridAccumulator(
+        lat_range=tuple(params["lat_range"]),
+        lon_range=tuple(params["lon_range"]),
+        lat_step=params["lat_step"],
+        lon_step=params["lon_step"],
+        columns={column: tuple(rng) for column, rng in params["columns"].items()},
+        sketch_bins=params["sketch_bins"],
+    )
+    for partition in partitions:
+        for chunk in _chunks(partition, params["chunk_size"]):
+            accumulator.update(chunk)
+    df = accumulator.to_frame(params["quantiles"])
+    print("Number of non-empty cells in the climatology: %d" % (len(df)))
+    return df
@@ -0,0 +1,27 @@
+""" Data analysis pipeline """
+from typing import Iterable
+
+from kedro.pipeline import Pipeline, node
+from minipro.pipelines.data_preparation.pipeline import partition_dataset_name
+from .nodes import build_climatology
+
+
+def create_pipeline(partitions: Iterable[str] = (), **kwargs):
+    """
+    Creates data analysis pipeline
+    Args:
+        partitions: Years or months of the archive
+    Returns:
+        A pipeline object containing all of the nodes that make it up
+    """
+    return Pipeline(
+        [
+            node(
+                build_climatology,
+                inputs=["params:climatology"]
+                + [partition_dataset_name(partition) for partition in partitions],
+                outputs="P_clouds_climatology",
+                name="build_climatology",
+            )
+        ]
+    )
@@ -1,26 +1,30 @@
 """ Nodes for the data engineering pipeline """
 import pandas as pd
-from typing import Tuple
+from typing import List, Tuple
 from sklearn.model_selection import train_test_split
+from minipro.pipelines.data_preparation.nodes import TARGET_COLUMNS
 
 
 def split_data(
-    p_clouds: pd.DataFrame, tst_data_pct: float
+    p_clouds: pd.DataFrame, tst_data_pct: float, targets: List[str]
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
-    Splits the cloud data into train and test set
+    Splits the cloud data into train and test set. All variables to predict
+    share the same split.
     Args:
         p_clouds: Dataframe that contains all the data points
         tst_data_pct: Proportion of the dataset to include in the test split
+        targets: Variables to predict, the first one being the main one
     Returns:
         A tuple made up of four datasets: X_train, Y_train, X_test, Y_test
     """
-    y = p_clouds.pop("nb_pocket_ice_over_area")
-    x = p_clouds
+    y = p_clouds[targets]
+    # None of the columns that can be predicted is used as an input variable
+    x = p_clouds.drop(columns=[col for col in TARGET_COLUMNS if col in p_clouds])
     x_trn, x_tst, y_trn, y_tst = train_test_split(x, y, test_size=tst_data_pct)
     return {
         "x_trn": x_trn,
         "x_tst": x_tst,
-        "y_trn": y_trn.to_frame(),
-        "y_tst": y_tst.to_frame(),
+        "y_trn": y_trn,
+        "y_tst": y_tst,
     }
@@ -13,11 +13,11 @@ def create_pipeline(**kwargs):
         [
             node(
                 split_data,
-                inputs=["P_clouds", "params:tst_data_pct"],
+                inputs=["P_clouds", "params:tst_data_pct", "params:targets"],
                 outputs={
-                    "x_trn": "P_clouds_trn_x",
+                    "x_trn": "P_clouds_trn_x@pandas",
                     "x_tst": "P_clouds_tst_x",
-                    "y_trn": "P_clouds_trn_y",
+                    "y_trn": "P_clouds_trn_y@pandas",
                     "y_tst": "P_clouds_tst_y",
                 },
                 name="split_data",
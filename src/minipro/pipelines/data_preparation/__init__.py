@@ -1 +1 @@
-from .pipeline import create_pipeline  # NOQA
+from .pipeline import archive_partitions, create_pipeline  # NOQA
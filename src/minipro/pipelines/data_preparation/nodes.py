@@ -1,9 +1,332 @@
 """ Nodes for the data preparation pipeline """
+import io
+import json
+import logging
+import time
 import pandas as pd
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
+logger = logging.getLogger(__name__)
 
-def preprocess(data_dir_mps: str, data_dir_era: str) -> pd.DataFrame:
+# Columns of each MPS data file
+COL_NAMES_MPS = [
+    "date",
+    # Area of the cloud
+    "area",
+    # Cloud optical depth
+    "tau",
+    # Standard deviation tau
+    "std_tau",
+    # Hydrometeor effective radius
+    "re",
+    # Std re
+    "std_re",
+    # Cloud top temperature
+    "ctt",
+    # Standad deviation ctt
+    "std_ctt",
+    # Cloud top height
+    "cth_mp",
+    # Std CTH
+    "std_cth",
+    # Cloud perimeter
+    "perim",
+    # Number of ice pixels
+    "nb_ice",
+    # Number of liquid pixels
+    "nb_liq",
+    # Mean effective radius of liquid cloud droplets
+    "re_liq",
+    # Mean effective radius of ice crytals
+    "re_ice",
+    "off1",
+    # Number of ice pockets (cluster of ice pixels) within the cloud
+    "nb_pocket_ice",
+    # Mean size of ice pockets
+    "size_pocket_ice",
+    # Standard deviation of ice pocket size
+    "size_pocket_std_ice",
+    # Number of liquid pockets (cluster of liquid pockets) within the cloud
+    "nb_pocket_liq",
+    # Mean size of liquid pockets
+    "size_pocket_liq",
+    # Standard deviation of liquid pocket size
+    "size_pocket_std_liq",
+    # Mean optical thickness of liquid pixels
+    "tau_liq",
+    # Mean optical thickness of ice pixels
+    "tau_ice",
+    # Mean longitude of cloud object
+    "lon",
+    # Mean latitude of cloud object
+    "lat",
+    # Minimum of cloud top temperature
+    "min_ctt",
+    # Maximum of cloud top temperature
+    "max_ctt",
+]
+# Columns of each ERA data file
+COL_NAMES_ERA = [
+    "off2",
+    # Convective available potential energy
+    "cape",
+    # Vertical velocity at 500 hPa
+    "omega",
+    # Sea surface temperature
+    "sst",
+    "off3",
+]
+# Columns that won't be used for training
+DROPPED_COLUMNS = [
+    "date",
+    "area",
+    "std_tau",
+    "re",
+    "std_re",
+    "std_ctt",
+    "cth_mp",
+    "std_cth",
+    "off1",
+    "nb_ice",
+    "nb_liq",
+    "nb_pocket_ice",
+    "size_pocket_ice",
+    "off2",
+    "size_pocket_std_ice",
+    "nb_pocket_liq",
+    "size_pocket_liq",
+    "size_pocket_std_liq",
+    "min_ctt",
+    "max_ctt",
+    "off3",
+]
+# Columns that can be predicted
+TARGET_COLUMNS = [
+    # Density of ice pockets
+    "nb_pocket_ice_over_area",
+    # Density of liquid pockets
+    "nb_pocket_liq_over_area",
+    # Fraction of ice pixels
+    "ice_fraction",
+]
+# Columns of the preprocessed dataframe
+COL_NAMES = [
+    col
+    for col in COL_NAMES_MPS + ["month"] + COL_NAMES_ERA + TARGET_COLUMNS
+    if col not in DROPPED_COLUMNS
+]
+
+
+def _list_file_pairs(
+    data_dir_mps: str, data_dir_era: str, partition: str = ""
+) -> List[Tuple[Path, Path]]:
+    """
+    Lists the MPS data files and their matching ERA data files.
+    There should be a matching ERA data file for each MPS data file that
+    should have the same name as the MPS file but with the suffix "CAPE"
+    Args:
+        data_dir_mps: Folder that contains the MPS data files
+        data_dir_era: Folder that contains the ERA data files
+        partition: Date prefix of the names of the MPS data files to read,
+        e.g. "2009" or "200901", all files by default
+    Returns:
+        A list of (MPS file, ERA file) paths, for MPS files that have an
+        existing ERA file
+    Raises:
+        ValueError: If no MPS data file of the partition has an ERA data file
+    """
+    pairs = []
+    for MPS_FILE in sorted(Path(data_dir_mps).glob("*.txt")):
+        # The names start with the date of the data, YYYYMMDD
+        if MPS_FILE.name[: len(partition)] != partition:
+            continue
+        ERA_FILE = Path(str(MPS_FILE.with_suffix("")) + "_CAPE.txt")
+        ERA_FILE = Path(str(ERA_FILE).replace(data_dir_mps, data_dir_era))
+        if ERA_FILE.exists():
+            pairs.append((MPS_FILE, ERA_FILE))
+    if not pairs:
+        raise ValueError(
+            "No MPS data file starting with '%s' in %s has a matching ERA data "
+            "file in %s" % (partition, data_dir_mps, data_dir_era)
+        )
+    return pairs
+
+
+def _parse_file_pair(MPS_FILE, ERA_FILE) -> Optional[pd.DataFrame]:
+    """
+    Parses one MPS data file and its matching ERA data file and filters out
+    malformed data points
+    Args:
+        MPS_FILE: Path or buffer of the MPS data file
+        ERA_FILE: Path or buffer of the ERA data file
+    Returns:
+        A dataframe that contains the well-formed data points of the files,
+        or None if the files are empty or do not have the same number of lines
+    """
+    # Parse each data file into dataframes
+    df_mps = pd.read_csv(MPS_FILE, delimiter=" ", names=COL_NAMES_MPS)
+    df_era = pd.read_csv(ERA_FILE, delimiter=" ", names=COL_NAMES_ERA)
+
+    if len(df_mps) != len(df_era) or df_mps.empty:
+        return None
+
+    # Adjust the value of two columns
+    df_mps["re_liq"] = df_mps["re_liq"] * 10 ** 6
+    df_mps["re_ice"] = df_mps["re_ice"] * 10 ** 6
+    # Format date column
+    df_mps["date"] = pd.to_datetime(
+        df_mps["date"].astype("int64").astype(str), format="%Y%m%d%H%M"
+    )
+    # Add a month column
+    df_mps["month"] = df_mps["date"].dt.month.astype("int64")
+
+    # Concatenate MPS and ERA dataframes
+    df = pd.concat([df_mps, df_era], axis=1)
+    # Add new column that we will try and predict
+    df["nb_pocket_ice_over_area"] = df.apply(
+        lambda row: row.nb_pocket_ice / row.area, axis=1
+    )
+    # Add the other columns that can be predicted, from the same predictors
+    df["nb_pocket_liq_over_area"] = df["nb_pocket_liq"] / df["area"]
+    df["ice_fraction"] = df["nb_ice"] / (df["nb_ice"] + df["nb_liq"])
+    # Filter out malformed data points
+    df = df[
+        ~df["re_liq"].isna()
+        & ~df["re_ice"].isna()
+        & (df["nb_ice"] > 3.0)
+        & (df["nb_liq"] > 3.0)
+        & (df["area"] > 50)
+        & (df["tau"] > 1.0)
+        & (df["size_pocket_ice"] != df["area"])
+        & (df["size_pocket_liq"] != df["area"])
+    ]
+
+    # Drop columns that won't be used for training
+    return df.drop(columns=DROPPED_COLUMNS)
+
+
+def _concat(list_df: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates dataframes of preprocessed data points
+    Args:
+        list_df: Dataframes to concatenate, possibly none
+    Returns:
+        A dataframe with a fresh index and the columns of COL_NAMES
+    """
+    if not list_df:
+        return pd.DataFrame(columns=COL_NAMES)
+    return pd.concat(list_df, axis=0).reset_index(drop=True)
+
+
+class PrefetchStats:
+    """
+    Metrics of the prefetching of data files: how many file pairs and bytes
+    were read, how long parsing waited for reads (stall time), and how many
+    file pairs were already read when parsing asked for the next one
+    (queue depth)
+    """
+
+    def __init__(self):
+        self.pairs = 0
+        self.bytes = 0
+        self.stall_time = 0.0
+        self.depths = []
+
+    def to_metrics(self) -> Dict[str, float]:
+        """
+        Returns:
+            The metrics, with names that can be compared between runs
+        """
+        return {
+            "prefetch_pairs": self.pairs,
+            "prefetch_mb": self.bytes / 2 ** 20,
+            "prefetch_stall_time_s": self.stall_time,
+            "prefetch_mean_queue_depth": sum(self.depths) / max(len(self.depths), 1),
+            "prefetch_max_queue_depth": max(self.depths, default=0),
+        }
+
+    def __str__(self) -> str:
+        return (
+            "Prefetched %(prefetch_pairs)d file pairs (%(prefetch_mb).1f MB), "
+            "stall time %(prefetch_stall_time_s).2f s, "
+            "mean queue depth %(prefetch_mean_queue_depth).1f, "
+            "max queue depth %(prefetch_max_queue_depth)d" % self.to_metrics()
+        )
+
+
+def _read_file_pair(pair: Tuple[Path, Path]) -> Tuple[bytes, bytes]:
+    MPS_FILE, ERA_FILE = pair
+    return MPS_FILE.read_bytes(), ERA_FILE.read_bytes()
+
+
+def _prefetch_file_pairs(
+    pairs: List[Tuple[Path, Path]], depth: int, stats: PrefetchStats
+) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    Reads file pairs ahead into memory on a pool of threads, so that reading
+    the next file pairs overlaps with parsing the current one
+    Args:
+        pairs: (MPS file, ERA file) paths to read, in order
+        depth: Maximum number of file pairs read ahead
+        stats: Metrics to update
+    Returns:
+        An iterator over the (MPS file, ERA file) contents, in order
+    """
+    remaining = iter(pairs)
+    with ThreadPoolExecutor(max_workers=depth) as executor:
+        pending = deque(
+            executor.submit(_read_file_pair, pair) for pair in islice(remaining, depth)
+        )
+        while pending:
+            stats.depths.append(sum(future.done() for future in pending))
+            start = time.perf_counter()
+            buffers = pending.popleft().result()
+            stats.stall_time += time.perf_counter() - start
+            stats.pairs += 1
+            stats.bytes += len(buffers[0]) + len(buffers[1])
+            next_pair = next(remaining, None)
+            if next_pair is not None:
+                pending.append(executor.submit(_read_file_pair, next_pair))
+            yield buffers
+
+
+def _preprocess_file_pairs(
+    pairs: List[Tuple[Path, Path]], prefetch_depth: int, partition: str = "all"
+) -> pd.DataFrame:
+    """
+    Parses file pairs read ahead by _prefetch_file_pairs. The prefetch
+    metrics are logged as one JSON line, e.g. in logs/info.log, so that they
+    can be compared between runs
+    Args:
+        pairs: (MPS file, ERA file) paths to read
+        prefetch_depth: Maximum number of file pairs read ahead
+        partition: Partition of the archive the files belong to
+    Returns:
+        A dataframe that contains the well-formed data points of the files
+    """
+    stats = PrefetchStats()
+    list_df = []
+    for mps_buffer, era_buffer in _prefetch_file_pairs(pairs, prefetch_depth, stats):
+        df = _parse_file_pair(io.BytesIO(mps_buffer), io.BytesIO(era_buffer))
+        if df is not None:
+            list_df.append(df)
+    print(stats)
+    logger.info(
+        "Prefetch metrics: %s",
+        json.dumps(
+            dict(stats.to_metrics(), partition=partition, depth=prefetch_depth)
+        ),
+    )
+    return _concat(list_df)
+
+
+def preprocess(
+    data_dir_mps: str, data_dir_era: str, prefetch_depth: int = 4
+) -> pd.DataFrame:
     """
     Reads all data files and filters out malformed data points.
     Each file represents all satellite measurements of clouds in a given day
@@ -15,157 +338,78 @@ def preprocess(data_dir_mps: str, data_dir_era: str) -> pd.DataFrame:
         Each MPS data file contains 28 columns
         data_dir_era: Folder that contains complementary data
         Each ERA data file contains 5 columns
+        prefetch_depth: Maximum number of file pairs read ahead of parsing
     Returns:
         A dataframe that contains all well-formed data points
     """
-    # Columns of each MPS data file
-    COL_NAMES_MPS = [
-        "date",
-        # Area of the cloud
-        "area",
-        # Cloud optical depth
-        "tau",
-        # Standard deviation tau
-        "std_tau",
-        # Hydrometeor effective radius
-        "re",
-        # Std re
-        "std_re",
-        # Cloud top temperature
-        "ctt",
-        # Standad deviation ctt
-        "std_ctt",
-        # Cloud top height
-        "cth_mp",
-        # Std CTH
-        "std_cth",
-        # Cloud perimeter
-        "perim",
-        # Number of ice pixels
-        "nb_ice",
-        # Number of liquid pixels
-        "nb_liq",
-        # Mean effective radius of liquid cloud droplets
-        "re_liq",
-        # Mean effective radius of ice crytals
-        "re_ice",
-        "off1",
-        # Number of ice pockets (cluster of ice pixels) within the cloud
-        "nb_pocket_ice",
-        # Mean size of ice pockets
-        "size_pocket_ice",
-        # Standard deviation of ice pocket size
-        "size_pocket_std_ice",
-        # Number of liquid pockets (cluster of liquid pockets) within the cloud
-        "nb_pocket_liq",
-        # Mean size of liquid pockets
-        "size_pocket_liq",
-        # Standard deviation of liquid pocket size
-        "size_pocket_std_liq",
-        # Mean optical thickness of liquid pixels
-        "tau_liq",
-        # Mean optical thickness of ice pixels
-        "tau_ice",
-        # Mean longitude of cloud object
-        "lon",
-        # Mean latitude of cloud object
-        "lat",
-        # Minimum of cloud top temperature
-        "min_ctt",
-        # Maximum of cloud top temperature
-        "max_ctt",
-    ]
-    # Columns of each ERA data file
-    COL_NAMES_ERA = [
-        "off2",
-        # Convective available potential energy
-        "cape",
-        # Vertical velocity at 500 hPa
-        "omega",
-        # Sea surface temperature
-        "sst",
-        "off3",
-    ]
+    # Create a dataframe from each data file
+    df = _preprocess_file_pairs(
+        _list_file_pairs(data_dir_mps, data_dir_era), prefetch_depth
+    )
+    print("Number of data points in our resulting data frame: %d" % (len(df)))
+    return df
 
-    # Retrieve a list of the paths of all MPS and ERA data files
-    # There should be a matching ERA data file for each MPS data file that
-    # should have the same name as the MPS file but with the suffix "CAPE"
-    I_FILES = list(Path(data_dir_mps).glob("*.txt"))
 
-    # Create a dataframe from each data file
-    list_df = []
-    for MPS_FILE in I_FILES:
-        ERA_FILE = Path(str(MPS_FILE.with_suffix("")) + "_CAPE.txt")
-        ERA_FILE = Path(str(ERA_FILE).replace(data_dir_mps, data_dir_era))
+def preprocess_partition(
+    data_dir_mps: str, data_dir_era: str, partition: str, prefetch_depth: int = 4
+) -> pd.DataFrame:
+    """
+    Reads the data files of one partition of the archive (a year such as
+    "2009" or a month such as "200901") and filters out malformed data
+    points. The data files of a partition are those whose name starts with
+    it, as the names start with the date of the data (YYYYMMDD).
+    Args:
+        data_dir_mps: Folder that contains one part of the data files
+        data_dir_era: Folder that contains complementary data
+        partition: Year or month of the data files to read
+        prefetch_depth: Maximum number of file pairs read ahead of parsing
+    Returns:
+        A dataframe that contains the well-formed data points of the partition
+    """
+    df = _preprocess_file_pairs(
+        _list_file_pairs(data_dir_mps, data_dir_era, partition),
+        prefetch_depth,
+        partition,
+    )
+    print("Number of data points in partition %s: %d" % (partition, len(df)))
+    return df
 
-        if ERA_FILE.exists():
-            # Parse each data file into dataframes
-            df_mps = pd.read_csv(MPS_FILE, delimiter=" ", names=COL_NAMES_MPS)
-            df_era = pd.read_csv(ERA_FILE, delimiter=" ", names=COL_NAMES_ERA)
-
-            if len(df_mps) == len(df_era):
-                # Adjust the value of two columns
-                df_mps["re_liq"] = df_mps["re_liq"] * 10 ** 6
-                df_mps["re_ice"] = df_mps["re_ice"] * 10 ** 6
-                # Format date column
-                df_mps["date"] = pd.to_datetime(
-                    df_mps["date"].astype("int64").astype(str), format="%Y%m%d%H%M"
-                )
-                # Add a month column
-                try:
-                    parse_function = lambda x: pd.Series([x["date"].month])
-                    df_mps[["month"]] = df_mps.apply(parse_function, axis=1)
-                except ValueError:
-                    continue
-
-                # Concatenate MPS and ERA dataframes
-                df = pd.concat([df_mps, df_era], axis=1)
-                # Add new column that we will try and predict
-                df["nb_pocket_ice_over_area"] = df.apply(
-                    lambda row: row.nb_pocket_ice / row.area, axis=1
-                )
-                # Filter out malformed data points
-                df = df[
-                    ~df["re_liq"].isna()
-                    & ~df["re_ice"].isna()
-                    & (df["nb_ice"] > 3.0)
-                    & (df["nb_liq"] > 3.0)
-                    & (df["area"] > 50)
-                    & (df["tau"] > 1.0)
-                    & (df["size_pocket_ice"] != df["area"])
-                    & (df["size_pocket_liq"] != df["area"])
-                ]
-
-                # Drop columns that won't be used for training
-                df = df.drop(
-                    columns=[
-                        "date",
-                        "area",
-                        "std_tau",
-                        "re",
-                        "std_re",
-                        "std_ctt",
-                        "cth_mp",
-                        "std_cth",
-                        "off1",
-                        "nb_ice",
-                        "nb_liq",
-                        "nb_pocket_ice",
-                        "size_pocket_ice",
-                        "off2",
-                        "size_pocket_std_ice",
-                        "nb_pocket_liq",
-                        "size_pocket_liq",
-                        "size_pocket_std_liq",
-                        "min_ctt",
-                        "max_ctt",
-                        "off3",
-                    ]
-                )
-
-                list_df.append(df)
-
-    # Concatenate all dataframes
-    df = pd.concat(list_df, axis=0).reset_index(drop=True)
+
+def list_partitions(data_dir_mps: str, length: int = 4) -> List[str]:
+    """
+    Lists the partitions of the archive that have data files
+    Args:
+        data_dir_mps: Folder that contains the MPS data files
+        length: Length of the date prefix of a partition, 4 for years and 6
+        for months
+    Returns:
+        The sorted date prefixes of the names of the MPS data files
+    """
+    return sorted(
+        {
+            MPS_FILE.name[:length]
+            for MPS_FILE in Path(data_dir_mps).glob("*.txt")
+            if MPS_FILE.name[:length].isdigit()
+        }
+    )
+
+
+def merge_partitions(*partitions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Concatenates the preprocessed partitions of the archive
+    Args:
+        partitions: Dataframes returned by preprocess_partition
+    Returns:
+        A dataframe that contains all well-formed data points
+    Raises:
+        ValueError: If there are no partitions, i.e. the folder of the MPS
+        data files is missing or empty
+    """
+    if not partitions:
+        raise ValueError(
+            "No partitions to merge, the folder of the MPS data files "
+            "(raw_data_dir_mps) is missing or has no data files"
+        )
+    df = _concat([partition for partition in partitions if len(partition)])
     print("Number of data points in our resulting data frame: %d" % (len(df)))
     return df
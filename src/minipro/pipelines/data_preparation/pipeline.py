@@ -1,21 +1,109 @@
 """ Data preparation pipeline """
+import re
+from functools import partial, update_wrapper
+from typing import Any, Dict, Iterable, List
+
 from kedro.pipeline import Pipeline, node
-from .nodes import preprocess
+from minipro.parameters import load_parameters
+from .nodes import list_partitions, preprocess_partition, merge_partitions
+
+# Name of the dataset that holds a preprocessed partition of the archive
+PARTITION_DATASET = "P_clouds_%s"
+
+
+def archive_partitions(conf_paths: Iterable[str] = None) -> List[str]:
+    """
+    Lists the years of the raw archive, from the names of the data files in
+    the folder of the raw_data_dir_mps parameter. Each year is preprocessed
+    by its own node
+    Args:
+        conf_paths: Configuration folders holding the parameters, defaults
+        to the parameters of the current Kedro session
+    Returns:
+        The sorted years of the archive
+    """
+    return list_partitions(load_parameters(conf_paths)["raw_data_dir_mps"])
+
+
+def partition_dataset_name(partition: str) -> str:
+    """
+    Name of the dataset that holds a preprocessed partition of the archive
+    """
+    return PARTITION_DATASET % partition
+
+
+def pipeline_partitions(pipeline: Pipeline) -> List[str]:
+    """
+    Lists the partitions of the archive whose preprocessed datasets are used
+    by a pipeline
+    """
+    pattern = re.compile(PARTITION_DATASET % r"(\d+)")
+    names = pipeline.all_inputs() | pipeline.all_outputs()
+    return sorted(
+        match.group(1) for match in map(pattern.fullmatch, names) if match is not None
+    )
+
+
+def partition_catalog(
+    partitions: Iterable[str], template: Dict[str, Any] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Creates the catalog entries of the preprocessed partitions, so that each
+    partition is persisted and only the failed ones need to be rebuilt. The
+    project hooks add them for the partitions of the pipeline being run
+    Args:
+        partitions: Years or months of the archive
+        template: Configuration of a dataset whose storage profile the entries
+        share, e.g. the P_clouds entry of conf/base/catalog.yml; its filepath
+        is replaced. Defaults to a ParquetDataSet
+    Returns:
+        A mapping from dataset name to dataset configuration
+    """
+    template = template or {"type": "pandas.ParquetDataSet"}
+    return {
+        partition_dataset_name(partition): dict(
+            template,
+            filepath="data/02_intermediate/clouds_partitions/clouds_%s.parquet"
+            % partition,
+        )
+        for partition in partitions
+    }
 
 
-def create_pipeline(**kwargs):
+def create_pipeline(partitions: Iterable[str] = (), **kwargs):
     """
-    Creates data preparation pipeline
+    Creates data preparation pipeline, with one node per partition of the
+    archive so that they can run in parallel with ParallelRunner
+    Args:
+        partitions: Years or months of the archive
     Returns:
         A pipeline object containing all of the nodes that make it up
     """
+    partitions = list(partitions)
+    preprocess_nodes = [
+        node(
+            update_wrapper(
+                partial(preprocess_partition, partition=partition),
+                preprocess_partition,
+            ),
+            inputs={
+                "data_dir_mps": "params:raw_data_dir_mps",
+                "data_dir_era": "params:raw_data_dir_era",
+                "prefetch_depth": "params:prefetch_depth",
+            },
+            outputs=partition_dataset_name(partition),
+            name="preprocess_%s" % partition,
+        )
+        for partition in partitions
+    ]
     return Pipeline(
-        [
+        preprocess_nodes
+        + [
             node(
-                preprocess,
-                inputs=["params:raw_data_dir_mps", "params:raw_data_dir_era"],
+                merge_partitions,
+                inputs=[partition_dataset_name(partition) for partition in partitions],
                 outputs="P_clouds",
-                name="preprocess",
+                name="merge_partitions",
             )
         ]
     )
@@ -1,74 +1,770 @@
 """ Nodes for the data science pipeline """
+import os
 import time
+import queue
+import hashlib
+import tempfile
+import multiprocessing
 import mlflow
+import numpy as np
 import pandas as pd
-from typing import Dict
+from pathlib import Path
+from typing import Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor
 import xgboost as xgb
-from sklearn.metrics import mean_squared_error
+from xgboost.tracker import RabitTracker
 import matplotlib.pyplot as plt
+from minipro.extras.parquet import ParquetTable
+from minipro.extras.quantiles import quantile_levels
 
 
-def train_model(
-    p_clouds_trn_x: pd.DataFrame,
-    p_clouds_trn_y: pd.DataFrame,
-    params: Dict[plt.figure, plt.figure],
-) -> xgb.sklearn.XGBRegressor:
+def _data_hash(*dfs: pd.DataFrame) -> str:
     """
-    Train a XGBoost regression model
+    Computes a digest of the content of dataframes
     Args:
-        p_clouds_trn_x: Input variables of our train set
-        p_clouds_trn_y: Variable to predict in our train set
-        params: XGBoost regression model hyperparameters
+        dfs: Dataframes to hash
     Returns:
-        A trained XGBoost regression model
+        The hexadecimal SHA-256 digest of the rows of all dataframes
+    """
+    digest = hashlib.sha256()
+    for df in dfs:
+        _update_digest(digest, df)
+    return digest.hexdigest()
+
+
+def _update_digest(
+    digest, data: Union[pd.DataFrame, ParquetTable], columns: List[str] = None
+) -> None:
+    """
+    Adds the columns and the rows of a dataframe to a hashlib digest. A
+    Parquet table is read one row group at a time, and gives the same digest
+    as the dataframe it holds
+    """
+    if isinstance(data, ParquetTable):
+        chunks = data.iter_row_groups(columns)
+    else:
+        chunks = [data if columns is None else data[columns]]
+    columns = list(data.columns) if columns is None else columns
+    digest.update(",".join(map(str, columns)).encode("utf-8"))
+    for df in chunks:
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+
+def _to_frame(data: Union[pd.DataFrame, ParquetTable]) -> pd.DataFrame:
+    """
+    Reads all rows of a Parquet table, or returns a dataframe as is
+    """
+    return data.read() if isinstance(data, ParquetTable) else data
+
+
+# Key of the quantile regression model among the models trained together
+QUANTILE_MODEL = "quantiles"
+
+
+def _xgb_params(xgbr: xgb.sklearn.XGBRegressor) -> Dict:
+    """
+    Booster parameters of a regressor, without the unset ones
     """
-    xgbr = xgb.XGBRegressor(
+    return {k: v for k, v in xgbr.get_xgb_params().items() if v is not None}
+
+
+def _group_by_label(labels: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Groups the names of the models by the variable they predict
+    """
+    groups = {}
+    for name, target in labels.items():
+        groups.setdefault(target, []).append(name)
+    return groups
+
+
+def _train_local(
+    x: pd.DataFrame,
+    y: pd.DataFrame,
+    regressors: Dict[str, xgb.sklearn.XGBRegressor],
+    labels: Dict[str, str],
+    n_jobs: int,
+) -> Dict[str, xgb.Booster]:
+    """
+    Trains all boosters in this process on a single quantile matrix: the
+    input variables are binned once, and the label of the matrix is swapped
+    for each variable to predict. The models that predict the same variable
+    are trained concurrently, each with an equal share of the thread budget.
+    """
+    groups = _group_by_label(labels)
+    dtrain = xgb.QuantileDMatrix(x, label=y[next(iter(groups))], nthread=n_jobs)
+
+    def fit(name: str) -> xgb.Booster:
+        xgbr = regressors[name]
+        return xgb.train(_xgb_params(xgbr), dtrain, num_boost_round=xgbr.n_estimators)
+
+    boosters = {}
+    for target, names in groups.items():
+        dtrain.set_label(y[target].to_numpy())
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            boosters.update(zip(names, executor.map(fit, names)))
+    return boosters
+
+
+def _distributed_worker(
+    worker_args: Dict,
+    x: ParquetTable,
+    y: ParquetTable,
+    rows: range,
+    xgb_params: Dict[str, Dict],
+    labels: Dict[str, str],
+    num_boost_round: int,
+    nthread: int,
+    results: multiprocessing.Queue,
+) -> None:
+    """
+    Trains all boosters on one shard of the train set, in sync with the other
+    workers, on a single quantile matrix whose label is swapped for each
+    variable to predict. The worker only reads its range of rows of the
+    Parquet files of the train set. The worker of rank 0 sends the serialized
+    boosters back to the parent process.
+    """
+    df_x = x.read(rows.start, rows.stop)
+    df_y = y.read(rows.start, rows.stop)
+    with xgb.collective.CommunicatorContext(**worker_args):
+        groups = _group_by_label(labels)
+        dtrain = xgb.QuantileDMatrix(
+            df_x, label=df_y[next(iter(groups))], nthread=nthread
+        )
+        del df_x
+        boosters = {}
+        for target, names in groups.items():
+            dtrain.set_label(df_y[target].to_numpy())
+            for name in names:
+                booster = xgb.train(
+                    dict(xgb_params[name], nthread=nthread),
+                    dtrain,
+                    num_boost_round=num_boost_round,
+                )
+                boosters[name] = bytes(booster.save_raw())
+        if xgb.collective.get_rank() == 0:
+            results.put(boosters)
+
+
+def _as_parquet_table(
+    data: Union[pd.DataFrame, ParquetTable], filepath: Path
+) -> ParquetTable:
+    """
+    Writes a dataframe to a Parquet file, or returns a Parquet table as is
+    """
+    if isinstance(data, ParquetTable):
+        return data
+    data.to_parquet(filepath)
+    return ParquetTable(str(filepath))
+
+
+def _train_distributed(
+    x: Union[pd.DataFrame, ParquetTable],
+    y: Union[pd.DataFrame, ParquetTable],
+    regressors: Dict[str, xgb.sklearn.XGBRegressor],
+    labels: Dict[str, str],
+    n_jobs: int,
+    n_workers: int,
+) -> Dict[str, xgb.Booster]:
+    """
+    Trains all boosters with local worker processes. Each worker reads one
+    range of rows of the Parquet files of the train set, and the workers
+    synchronize through a tracker started on localhost. Dataframes are first
+    written to temporary Parquet files.
+    """
+    tracker = RabitTracker(n_workers=n_workers, host_ip="127.0.0.1")
+    tracker.start()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    xgb_params = {name: _xgb_params(xgbr) for name, xgbr in regressors.items()}
+    num_boost_round = next(iter(regressors.values())).n_estimators
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        x = _as_parquet_table(x, Path(tmp_dir) / "x.parquet")
+        y = _as_parquet_table(y, Path(tmp_dir) / "y.parquet")
+        bounds = np.linspace(0, len(x), n_workers + 1).astype(int)
+        workers = [
+            context.Process(
+                target=_distributed_worker,
+                args=(
+                    tracker.worker_args(),
+                    x,
+                    y,
+                    range(start, stop),
+                    xgb_params,
+                    labels,
+                    num_boost_round,
+                    max(1, n_jobs // n_workers),
+                    results,
+                ),
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        for worker in workers:
+            worker.start()
+
+        raw_boosters = None
+        while raw_boosters is None:
+            try:
+                raw_boosters = results.get(timeout=1)
+            except queue.Empty:
+                if any(worker.exitcode not in (None, 0) for worker in workers):
+                    for worker in workers:
+                        worker.terminate()
+                    raise RuntimeError("A distributed training worker failed")
+        for worker in workers:
+            worker.join()
+    tracker.wait_for()
+
+    return {
+        name: xgb.Booster(model_file=bytearray(raw))
+        for name, raw in raw_boosters.items()
+    }
+
+
+def _regressor(params: Dict, n_jobs: int, **kwargs) -> xgb.sklearn.XGBRegressor:
+    """
+    XGBoost regression model with the hyperparameters of the parameters
+    """
+    return xgb.XGBRegressor(
         n_estimators=params["n_estimators"],
         max_depth=params["max_depth"],
         learning_rate=params["learning_rate"],
         subsample=params["subsample"],
         colsample_bytree=params["colsample_bytree"],
+        n_jobs=n_jobs,
+        **kwargs,
     )
-    xgbr.fit(p_clouds_trn_x, p_clouds_trn_y)
-    score = xgbr.score(p_clouds_trn_x, p_clouds_trn_y)
-    print("Training score:", score)
-    return {"model": xgbr}
+
+
+def _fit(
+    x: Union[pd.DataFrame, ParquetTable],
+    y: Union[pd.DataFrame, ParquetTable],
+    regressors: Dict[str, xgb.sklearn.XGBRegressor],
+    labels: Dict[str, str],
+    n_jobs: int,
+    n_workers: int,
+) -> Dict[str, xgb.sklearn.XGBRegressor]:
+    """
+    Trains regressors either in this process or with local worker processes,
+    and records the hash of their training data in their boosters
+    Args:
+        x: Input variables of the train set, a dataframe to train in this
+        process
+        y: Variables to predict in the train set, one per column, a dataframe
+        to train in this process
+        regressors: Mapping from the name of each model to its regressor
+        labels: Mapping from the name of each model to the column of y it
+        predicts
+        n_jobs: Number of threads shared by all models
+        n_workers: Number of worker processes, 1 to train in this process
+    Returns:
+        The trained regressors
+    """
+    if n_workers > 1:
+        boosters = _train_distributed(x, y, regressors, labels, n_jobs, n_workers)
+    else:
+        boosters = _train_local(x, y, regressors, labels, n_jobs)
+
+    # Keep track of the data the models were trained with in the model
+    # artifacts, the input variables are only hashed once
+    x_digest = hashlib.sha256()
+    _update_digest(x_digest, x)
+    for name, target in labels.items():
+        digest = x_digest.copy()
+        _update_digest(digest, y, [target])
+        booster = boosters[name]
+        booster.set_attr(training_data_hash=digest.hexdigest())
+        regressors[name].load_model(booster.save_raw())
+    return regressors
+
+
+def train_model(
+    p_clouds_trn_x: Union[pd.DataFrame, ParquetTable],
+    p_clouds_trn_y: Union[pd.DataFrame, ParquetTable],
+    params: Dict[plt.figure, plt.figure],
+) -> xgb.sklearn.XGBRegressor:
+    """
+    Train a XGBoost regression model for each variable to predict.
+    The input variables are converted and binned into a single quantile
+    matrix that is shared by all models, and whose label is swapped for each
+    variable to predict. The models are either trained in this process, one
+    after the other with all threads, or by a group of local worker
+    processes that each read one shard of the train set from its Parquet
+    files (distributed training, when n_workers is above 1). The train set
+    is then never loaded in this process, and the training score is not
+    computed.
+    Args:
+        p_clouds_trn_x: Input variables of our train set, as a dataframe or
+        as a Parquet table that is only read in full to train in this process
+        p_clouds_trn_y: Variables to predict in our train set, one per column,
+        as a dataframe or as a Parquet table
+        params: XGBoost regression model hyperparameters, number of threads
+        shared by all models (n_jobs, defaults to all cores) and number of
+        worker processes (n_workers, defaults to 1)
+    Returns:
+        The trained XGBoost regression model of the first variable to
+        predict, and a mapping from each variable to predict to its model
+    """
+    n_jobs = params.get("n_jobs") or os.cpu_count()
+    n_workers = params.get("n_workers") or 1
+    if n_workers == 1:
+        p_clouds_trn_x = _to_frame(p_clouds_trn_x)
+        p_clouds_trn_y = _to_frame(p_clouds_trn_y)
+    targets = list(p_clouds_trn_y.columns)
+    models = _fit(
+        p_clouds_trn_x,
+        p_clouds_trn_y,
+        {target: _regressor(params, n_jobs) for target in targets},
+        {target: target for target in targets},
+        n_jobs,
+        n_workers,
+    )
+    if n_workers == 1:
+        for target in targets:
+            score = models[target].score(p_clouds_trn_x, p_clouds_trn_y[target])
+            print("Training score (%s):" % target, score)
+    return {"model": models[targets[0]], "target_models": models}
+
+
+def train_quantile_model(
+    p_clouds_trn_x: Union[pd.DataFrame, ParquetTable],
+    p_clouds_trn_y: Union[pd.DataFrame, ParquetTable],
+    params: Dict,
+) -> xgb.sklearn.XGBRegressor:
+    """
+    Train a XGBoost quantile regression model of the first variable to
+    predict, that predicts all quantiles at once, one per output, e.g.
+    P10/P50/P90 of nb_pocket_ice_over_area. It is trained like the models of
+    train_model, in this process or by local worker processes, and the
+    training coverage of its intervals is only computed in this process.
+    Args:
+        p_clouds_trn_x: Input variables of our train set, as a dataframe or
+        as a Parquet table
+        p_clouds_trn_y: Variables to predict in our train set, one per column,
+        as a dataframe or as a Parquet table
+        params: XGBoost regression model hyperparameters, number of threads
+        (n_jobs, defaults to all cores), number of worker processes
+        (n_workers, defaults to 1) and quantiles to predict (quantiles)
+    Returns:
+        The trained XGBoost quantile regression model
+    Raises:
+        ValueError: If fewer than two quantiles, or a quantile outside of
+        ]0, 1[, are given
+    """
+    n_jobs = params.get("n_jobs") or os.cpu_count()
+    n_workers = params.get("n_workers") or 1
+    quantiles = sorted(params.get("quantiles") or [])
+    if len(quantiles) < 2 or any(not 0 < q < 1 for q in quantiles):
+        raise ValueError(
+            "Expected at least two quantiles between 0 and 1 to bound the "
+            "prediction intervals, got %s" % quantiles
+        )
+    if n_workers == 1:
+        p_clouds_trn_x = _to_frame(p_clouds_trn_x)
+        p_clouds_trn_y = _to_frame(p_clouds_trn_y)
+    target = p_clouds_trn_y.columns[0]
+    regressor = _regressor(
+        params, n_jobs, objective="reg:quantileerror", quantile_alpha=quantiles
+    )
+    quantile_model = _fit(
+        p_clouds_trn_x,
+        p_clouds_trn_y,
+        {QUANTILE_MODEL: regressor},
+        {QUANTILE_MODEL: target},
+        n_jobs,
+        n_workers,
+    )[QUANTILE_MODEL]
+    if n_workers > 1:
+        return quantile_model
+
+    preds = quantile_model.predict(p_clouds_trn_x)
+    y = p_clouds_trn_y[target].to_numpy()
+    coverage = np.mean((y >= preds[:, 0]) & (y <= preds[:, -1]))
+    print(
+        "Training coverage of the P%d-P%d interval (%s):"
+        % (round(quantiles[0] * 100), round(quantiles[-1] * 100), target),
+        coverage,
+    )
+    return quantile_model
+
+
+def _model_hash(model: xgb.sklearn.XGBRegressor) -> str:
+    """
+    Computes a digest of the trees and parameters of a trained model
+    Args:
+        model: A trained XGBoost regression model
+    Returns:
+        The hexadecimal SHA-256 digest of the serialized booster
+    """
+    return hashlib.sha256(bytes(model.get_booster().save_raw())).hexdigest()
+
+
+def _stratified_sample(
+    df: pd.DataFrame, column: str, size: int, random_state: int
+) -> pd.DataFrame:
+    """
+    Draws a sample that keeps the proportions of each value of a column
+    Args:
+        df: Dataframe to sample from
+        column: Column whose values define the strata
+        size: Approximate number of rows to draw
+        random_state: Seed of the random number generator
+    Returns:
+        The sampled rows, with their original index
+    """
+    if size >= len(df):
+        return df
+    frac = size / len(df)
+    return df.groupby(column, group_keys=False).sample(
+        frac=frac, random_state=random_state
+    )
+
+
+def explain_model(
+    p_clouds_tst_x: pd.DataFrame,
+    model: xgb.sklearn.XGBRegressor,
+    params: Dict,
+) -> pd.DataFrame:
+    """
+    Computes the contribution of each feature to each prediction of a trained
+    XGBoost regression model (TreeSHAP values) on a stratified sample of the
+    test set. The sample is scored in chunks on a pool of threads, and the
+    attributions are cached as a Parquet file named after the hash of the
+    model, the hash of the test set and the sampling parameters, so they are
+    only computed once per trained model and test set.
+    Args:
+        p_clouds_tst_x: Input variables of our test set
+        model: A trained XGBoost regression model
+        params: Sample size, stratification column, chunk size, number of
+        threads and cache folder used to compute the attributions
+    Returns:
+        A dataframe with one row per sampled data point and one column per
+        feature, plus a "bias" column, indexed like the test set
+    """
+    # The attributions depend on the model, the test set and the sampling
+    cache_file = Path(params["cache_dir"]) / "{}_{}_{}_{}_{}.parquet".format(
+        _model_hash(model),
+        _data_hash(p_clouds_tst_x),
+        params["stratify_by"],
+        params["sample_size"],
+        params["random_state"],
+    )
+    if cache_file.exists():
+        print("Loading feature attributions from %s" % cache_file)
+        return pd.read_parquet(cache_file)
+
+    df_sample = _stratified_sample(
+        p_clouds_tst_x,
+        params["stratify_by"],
+        params["sample_size"],
+        params["random_state"],
+    )
+    # One single-threaded booster shared by all workers so that the chunks,
+    # and not the trees, are spread across the cores
+    booster = model.get_booster().copy()
+    booster.set_param({"nthread": 1})
+
+    def contribs(chunk: pd.DataFrame) -> np.ndarray:
+        return booster.predict(xgb.DMatrix(chunk, nthread=1), pred_contribs=True)
+
+    chunk_size = params["chunk_size"]
+    chunks = [
+        df_sample.iloc[i : i + chunk_size]
+        for i in range(0, len(df_sample), chunk_size)
+    ]
+    with ThreadPoolExecutor(max_workers=params["n_jobs"]) as executor:
+        values = np.concatenate(list(executor.map(contribs, chunks)), axis=0)
+
+    df_contribs = pd.DataFrame(
+        values, index=df_sample.index, columns=list(df_sample.columns) + ["bias"]
+    )
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    df_contribs.to_parquet(cache_file)
+    return df_contribs
+
+
+def partial_dependence(
+    p_clouds_tst_x: pd.DataFrame,
+    model: xgb.sklearn.XGBRegressor,
+    params: Dict,
+) -> pd.DataFrame:
+    """
+    Computes individual conditional expectation (ICE) curves of a trained
+    XGBoost regression model for a list of features. For each feature, every
+    sampled data point is evaluated at every value of a quantile grid of that
+    feature. The evaluation matrices of all features are stacked into one
+    array and scored with a single predict call.
+    Args:
+        p_clouds_tst_x: Input variables of our test set
+        model: A trained XGBoost regression model
+        params: Features to evaluate, size of their grid, number of sampled
+        data points and seed of the sampling
+    Returns:
+        A long dataframe with the columns "feature", "grid_value", "sample_id"
+        and "prediction". Averaging the predictions over "sample_id" gives the
+        partial dependence curve of each feature
+    """
+    df_sample = p_clouds_tst_x.sample(
+        min(params["sample_size"], len(p_clouds_tst_x)),
+        random_state=params["random_state"],
+    )
+    base = df_sample.to_numpy(dtype=np.float64)
+    n_samples = len(base)
+    quantiles = np.linspace(0.0, 1.0, params["grid_size"])
+
+    blocks, features, grid_values = [], [], []
+    for feature in params["features"]:
+        col = df_sample.columns.get_loc(feature)
+        grid = np.unique(np.nanquantile(base[:, col], quantiles))
+        # Row k * n_samples + i holds sample i with the feature set to grid[k]
+        block = np.tile(base, (len(grid), 1))
+        block[:, col] = np.repeat(grid, n_samples)
+        blocks.append(block)
+        features.append(np.full(len(block), feature, dtype=object))
+        grid_values.append(np.repeat(grid, n_samples))
+
+    matrix = np.concatenate(blocks, axis=0)
+    preds = model.predict(pd.DataFrame(matrix, columns=df_sample.columns))
+    return pd.DataFrame(
+        {
+            "feature": np.concatenate(features),
+            "grid_value": np.concatenate(grid_values),
+            "sample_id": np.tile(np.arange(n_samples), len(matrix) // n_samples),
+            "prediction": preds,
+        }
+    )
+
+
+class SlicedMetrics:
+    """
+    Running regression metrics (MSE, MAE, R² and bias) of predictions over
+    the whole test set and over slices of it, e.g. by month, latitude band
+    or cloud top temperature regime. Each slice splits a column into bins
+    defined by their edges. The sums the metrics are derived from are
+    accumulated with ``np.bincount``, so the predictions can be evaluated
+    one chunk at a time in a single pass. When prediction intervals are
+    given, the coverage and the mean width of the intervals are computed
+    as well.
+    """
+
+    # Sums accumulated for each bin of each slice
+    SUMS = [
+        "count",
+        "error",
+        "abs_error",
+        "sq_error",
+        "y",
+        "sq_y",
+        "covered",
+        "width",
+    ]
+
+    def __init__(self, slices: Dict[str, Dict]):
+        """
+        Args:
+            slices: Mapping from the name of a slice to its "column", the
+            "edges" of its bins, and optionally the "labels" of its bins
+        """
+        self.slices = {"all": {"column": None, "edges": [-np.inf, np.inf]}}
+        self.slices.update(slices)
+        self.sums = {
+            name: np.zeros((len(spec["edges"]) - 1, len(self.SUMS)))
+            for name, spec in self.slices.items()
+        }
+        self.intervals = False
+
+    def labels(self, name: str) -> List[str]:
+        """
+        Labels of the bins of a slice
+        """
+        spec = self.slices[name]
+        if name == "all":
+            return ["all"]
+        if "labels" in spec:
+            return [str(label) for label in spec["labels"]]
+        edges = spec["edges"]
+        return ["%g_%g" % (low, high) for low, high in zip(edges[:-1], edges[1:])]
+
+    def update(
+        self,
+        x: pd.DataFrame,
+        y: np.ndarray,
+        preds: np.ndarray,
+        lower: np.ndarray = None,
+        upper: np.ndarray = None,
+    ) -> "SlicedMetrics":
+        """
+        Adds a chunk of predictions to the running sums
+        Args:
+            x: Input variables of the chunk, holding the slice columns
+            y: True values of the variable to predict
+            preds: Predicted values of the variable to predict
+            lower: Lower bounds of the prediction intervals, if any
+            upper: Upper bounds of the prediction intervals, if any
+        Returns:
+            The metrics themselves
+        """
+        y = np.asarray(y, dtype=np.float64).ravel()
+        error = np.asarray(preds, dtype=np.float64).ravel() - y
+        if lower is not None and upper is not None:
+            self.intervals = True
+            lower = np.asarray(lower, dtype=np.float64).ravel()
+            upper = np.asarray(upper, dtype=np.float64).ravel()
+            covered = ((y >= lower) & (y <= upper)).astype(np.float64)
+            width = upper - lower
+        else:
+            covered = width = np.zeros(len(y))
+        weights = [None, error, np.abs(error), error ** 2, y, y ** 2, covered, width]
+        for name, spec in self.slices.items():
+            n_bins = len(spec["edges"]) - 1
+            if spec["column"] is None:
+                bins = np.zeros(len(y), dtype=np.int64)
+            else:
+                values = x[spec["column"]].to_numpy()
+                bins = np.searchsorted(spec["edges"], values, side="right") - 1
+            valid = (bins >= 0) & (bins < n_bins)
+            for j, weight in enumerate(weights):
+                self.sums[name][:, j] += np.bincount(
+                    bins[valid],
+                    weights=None if weight is None else weight[valid],
+                    minlength=n_bins,
+                )
+        return self
+
+    def merge(self, other: "SlicedMetrics") -> "SlicedMetrics":
+        """
+        Adds the running sums of other metrics with the same slices
+        """
+        for name in self.sums:
+            self.sums[name] += other.sums[name]
+        self.intervals = self.intervals or other.intervals
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Computes the metrics of each bin of each slice
+        Returns:
+            A dataframe with the columns "slice", "bin", "count", "mse",
+            "mae", "r2" and "bias", and "coverage" and "interval_width" when
+            prediction intervals were given, with one row per bin of each
+            slice
+        """
+        frames = []
+        for name, sums in self.sums.items():
+            count, error, abs_error, sq_error, y, sq_y, covered, width = sums.T
+            with np.errstate(divide="ignore", invalid="ignore"):
+                total_variance = sq_y - y ** 2 / count
+                df = pd.DataFrame(
+                    {
+                        "slice": name,
+                        "bin": self.labels(name),
+                        "count": count.astype(np.int64),
+                        "mse": sq_error / count,
+                        "mae": abs_error / count,
+                        "r2": 1 - sq_error / total_variance,
+                        "bias": error / count,
+                    }
+                )
+                if self.intervals:
+                    df["coverage"] = covered / count
+                    df["interval_width"] = width / count
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+    def to_mlflow_metrics(self) -> Dict[str, float]:
+        """
+        Flattens the metrics of the non-empty bins into MLflow metric names:
+        "test_<metric>" for the whole test set and
+        "<metric>/<slice>/<bin>" for the bins of the slices
+        """
+        names = ["mse", "mae", "r2", "bias"]
+        if self.intervals:
+            names += ["coverage", "interval_width"]
+        metrics = {}
+        for row in self.to_frame().itertuples(index=False):
+            if row.count == 0:
+                continue
+            for metric in names:
+                value = getattr(row, metric)
+                if not np.isfinite(value):
+                    continue
+                if row.slice == "all":
+                    metrics["test_" + metric] = value
+                else:
+                    metrics["%s/%s/%s" % (metric, row.slice, row.bin)] = value
+        return metrics
 
 
 def predict_and_evaluate(
     p_clouds_tst_x: pd.DataFrame,
     p_clouds_tst_y: pd.DataFrame,
     model: xgb.sklearn.XGBRegressor,
+    feature_attributions: pd.DataFrame,
+    ice_curves: pd.DataFrame,
     mlflow_experiment: str,
-) -> None:
+    params: Dict,
+    quantile_model: xgb.sklearn.XGBRegressor = None,
+) -> pd.DataFrame:
     """
-    Use a trained XGBoost regression model to make predictions in a test set
-    and compute the mean squared error (MSE). It logs the hyperparameters of
-    the model, its MSE score on the test set, and two plots to MLFlow:
+    Use a trained XGBoost regression model to make predictions in a test set,
+    one chunk at a time, and compute the mean squared error (MSE), the mean
+    absolute error (MAE), R² and the bias over the whole test set and over
+    its slices. All quantiles of the quantile regression model are predicted
+    in the same pass, one call per chunk, and the coverage and width of the
+    interval between the lowest and the highest quantile are computed over
+    the same slices. It logs the hyperparameters of the model, all metrics in one
+    batch, and three plots to MLFlow:
         A feature importance plot for the trained XGBoost regression model 
-        A variable correlation plot for the trained XGBoost regression model
+        A feature attribution plot ranking the mean absolute TreeSHAP values
+        A partial dependence plot of the features listed in the parameters
     Args:
         p_clouds_tst_x: Input variables of our test set
         p_clouds_tst_y: Variable to predict in our test set
         model: A trained XGBoost regression model
+        feature_attributions: TreeSHAP values of a sample of the test set
+        ice_curves: ICE curves of a sample of the test set
         mlflow_experiment: Name to give our MLFLow experiment
+        params: Chunk size of the predictions and slices of the test set
+        quantile_model: A trained XGBoost quantile regression model, if any
+    Returns:
+        A dataframe with the metrics of each bin of each slice
     """
-    # Make predictions
-    preds = model.predict(p_clouds_tst_x)
-    # Compute MSE
-    mse = mean_squared_error(p_clouds_tst_y, preds)
-    print("MSE: %.8f" % mse)
+    # Make predictions and compute the metrics one chunk at a time
+    y_tst = p_clouds_tst_y.iloc[:, 0].to_numpy()
+    metrics = SlicedMetrics(params["slices"])
+    chunk_size = params["chunk_size"]
+    for i in range(0, len(p_clouds_tst_x), chunk_size):
+        df_chunk = p_clouds_tst_x.iloc[i : i + chunk_size]
+        lower = upper = None
+        if quantile_model is not None:
+            quantile_preds = quantile_model.predict(df_chunk).reshape(len(df_chunk), -1)
+            lower, upper = quantile_preds[:, 0], quantile_preds[:, -1]
+        metrics.update(
+            df_chunk,
+            y_tst[i : i + chunk_size],
+            model.predict(df_chunk),
+            lower,
+            upper,
+        )
+    evaluation_report = metrics.to_frame()
+    mlflow_metrics = metrics.to_mlflow_metrics()
+    print("MSE: %.8f" % mlflow_metrics.get("test_mse", np.nan))
+    if metrics.intervals:
+        print("Interval coverage: %.4f" % mlflow_metrics.get("test_coverage", np.nan))
 
     mlflow.set_experiment(mlflow_experiment)
     run_name = mlflow_experiment + time.strftime("_%y%m%d_%H%M%S")
     with mlflow.start_run(run_name=run_name):
         # Log params and metrics
-        params = model.get_xgb_params()
-        mlflow.log_param("max_depth", params["max_depth"])
-        mlflow.log_param("learning_rate", params["learning_rate"])
-        mlflow.log_param("subsample", params["subsample"])
-        mlflow.log_param("colsample_bytree", params["colsample_bytree"])
-        mlflow.log_metric("training_score", mse)
+        xgb_params = model.get_xgb_params()
+        mlflow.log_param("max_depth", xgb_params["max_depth"])
+        mlflow.log_param("learning_rate", xgb_params["learning_rate"])
+        mlflow.log_param("subsample", xgb_params["subsample"])
+        mlflow.log_param("colsample_bytree", xgb_params["colsample_bytree"])
+        if quantile_model is not None:
+            mlflow.log_param("quantiles", quantile_levels(quantile_model))
+        mlflow.log_metrics(mlflow_metrics)
 
         # Feature importace plot
         plot_feat_importance = plt.figure(1)
@@ -79,21 +775,40 @@ def predict_and_evaluate(
         plt.xlabel("XGBoost Feature Importance")
         plt.title("Feature importance")
 
-        # Var correlation plot
-        df_plot = p_clouds_tst_x.sample(25, random_state=42)
-        preds = model.predict(df_plot)
-        plot_var_correlation = plt.figure(2)
-        plt.plot(df_plot["re_liq"], model.predict(df_plot), color="blue")
-        plt.xlabel("re_liq")
-        plt.ylabel("nb_pocket_ice_over_area")
-        plt.title("Correlation")
+        # Feature attribution plot
+        mean_abs_contribs = (
+            feature_attributions.drop(columns="bias").abs().mean().sort_values()
+        )
+        plot_feat_attribution = plt.figure(3)
+        plt.barh(mean_abs_contribs.index, mean_abs_contribs.values)
+        plt.xlabel("Mean |TreeSHAP value|")
+        plt.title("Feature attribution")
+
+        # Partial dependence plot
+        feature_names = ice_curves["feature"].unique()
+        plot_partial_dependence, axes = plt.subplots(
+            1, len(feature_names), figsize=(4 * len(feature_names), 4), squeeze=False
+        )
+        for ax, feature in zip(axes[0], feature_names):
+            df_feature = ice_curves[ice_curves["feature"] == feature]
+            df_ice = df_feature.pivot(
+                index="grid_value", columns="sample_id", values="prediction"
+            )
+            ax.plot(df_ice.index, df_ice.values, color="grey", alpha=0.05)
+            ax.plot(df_ice.index, df_ice.mean(axis=1), color="blue")
+            ax.set_xlabel(feature)
+        axes[0][0].set_ylabel("nb_pocket_ice_over_area")
+        plot_partial_dependence.suptitle("Partial dependence")
 
         # Log figures
         mlflow.log_figure(
             plot_feat_importance, artifact_file="figure/feat_importance.png"
         )
         mlflow.log_figure(
-            plot_var_correlation, artifact_file="figure/var_correlation.png"
+            plot_feat_attribution, artifact_file="figure/feat_attribution.png"
+        )
+        mlflow.log_figure(
+            plot_partial_dependence, artifact_file="figure/partial_dependence.png"
         )
 
-    return None
+    return evaluation_report
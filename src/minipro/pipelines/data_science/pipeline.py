@@ -1,32 +1,70 @@
 """ Data science pipeline """
 from kedro.pipeline import Pipeline, node
-from .nodes import train_model, predict_and_evaluate
+from .nodes import (
+    train_model,
+    train_quantile_model,
+    explain_model,
+    partial_dependence,
+    predict_and_evaluate,
+)
 
 
-def create_pipeline(**kwargs):
+def create_pipeline(quantiles: bool = False, **kwargs):
     """
     Creates data science pipeline
+    Args:
+        quantiles: Whether a quantile regression model of the quantiles of
+        the model.quantiles parameter is trained, and the coverage of its
+        prediction intervals evaluated
     Returns:
         A pipeline object containing all of the nodes that make it up
     """
+    evaluate_inputs = {
+        "p_clouds_tst_x": "P_clouds_tst_x",
+        "p_clouds_tst_y": "P_clouds_tst_y",
+        "model": "model",
+        "feature_attributions": "feature_attributions",
+        "ice_curves": "partial_dependence",
+        "mlflow_experiment": "params:mlflow_experiment",
+        "params": "params:evaluation",
+    }
+    quantile_nodes = []
+    if quantiles:
+        quantile_nodes.append(
+            node(
+                train_quantile_model,
+                inputs=["P_clouds_trn_x@table", "P_clouds_trn_y@table", "params:model"],
+                outputs="quantile_model",
+                name="train_quantiles",
+            )
+        )
+        evaluate_inputs["quantile_model"] = "quantile_model"
     return Pipeline(
         [
             node(
                 train_model,
-                inputs=["P_clouds_trn_x", "P_clouds_trn_y", "params:model"],
-                outputs={"model": "model"},
+                inputs=["P_clouds_trn_x@table", "P_clouds_trn_y@table", "params:model"],
+                outputs={"model": "model", "target_models": "target_models"},
                 name="train",
             ),
+            node(
+                explain_model,
+                inputs=["P_clouds_tst_x", "model", "params:explain"],
+                outputs="feature_attributions",
+                name="explain",
+            ),
+            node(
+                partial_dependence,
+                inputs=["P_clouds_tst_x", "model", "params:partial_dependence"],
+                outputs="partial_dependence",
+                name="partial_dependence",
+            ),
             node(
                 predict_and_evaluate,
-                inputs=[
-                    "P_clouds_tst_x",
-                    "P_clouds_tst_y",
-                    "model",
-                    "params:mlflow_experiment",
-                ],
-                outputs=None,
+                inputs=evaluate_inputs,
+                outputs="evaluation_report",
                 name="predict_and_evaluate",
             ),
         ]
+        + quantile_nodes
     )
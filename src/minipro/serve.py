@@ -0,0 +1,402 @@
+"""Local prediction server for the trained model
+
+Serves the ``model`` of the data science pipeline over HTTP without running a
+Kedro session per request. Run it with ``minipro-serve`` or
+``python -m minipro.serve`` from the project root. Concurrent requests are
+grouped into micro-batches so that the model is called once per batch. When
+a ``quantile_model`` is given, all of its quantiles are predicted for the same
+batch, in one more call.
+
+Endpoints:
+    POST /predict  {"instances": [{"tau": ..., "ctt": ..., ...}, ...]}
+                   or {"rows": [[...], ...]} in the training column order
+                   returns {"predictions": [...]} and, with a quantile model,
+                   {"quantile_levels": [...], "quantiles": [[...], ...]}
+    GET  /metrics  latency percentiles, throughput and batching counters
+    GET  /health   liveness probe
+"""
+import argparse
+import json
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from minipro.extras.quantiles import quantile_levels
+
+
+def load_columns(filepath: str) -> List[str]:
+    """
+    Reads the training column order from the schema of a Parquet file
+    Args:
+        filepath: Path to the input variables of our train set
+    Returns:
+        The list of feature names, in the order the model was trained with
+    """
+    schema = pq.read_schema(filepath)
+    return [name for name in schema.names if not name.startswith("__index_level")]
+
+
+def load_model(filepath: str) -> Any:
+    """
+    Loads the trained model saved by the data science pipeline
+    Args:
+        filepath: Path to the model artifact, in the native XGBoost format
+        (.ubj or .json) or pickled
+    Returns:
+        A trained XGBoost regression model
+    """
+    if filepath.endswith((".ubj", ".json")):
+        # pylint: disable=import-outside-toplevel
+        from minipro.extras.datasets.xgboost_dataset import XGBoostModelDataSet
+
+        return XGBoostModelDataSet(filepath).load()
+    with open(filepath, "rb") as f:
+        return pickle.load(f)
+
+
+def validate_rows(payload: Dict, columns: List[str]) -> np.ndarray:
+    """
+    Converts the body of a prediction request into a feature matrix
+    Args:
+        payload: Decoded JSON body, with either an "instances" list of
+        mappings from feature name to value, or a "rows" list of lists in the
+        training column order
+        columns: Training column order
+    Returns:
+        A 2D float array with one row per data point
+    Raises:
+        ValueError: If the payload does not match the training columns
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    if "instances" in payload:
+        instances = payload["instances"]
+        if not isinstance(instances, list):
+            raise ValueError('"instances" must be a list of objects')
+        rows = []
+        for i, instance in enumerate(instances):
+            if not isinstance(instance, dict):
+                raise ValueError("Instance %d must be an object" % i)
+            missing = set(columns) - set(instance)
+            unknown = set(instance) - set(columns)
+            if missing or unknown:
+                raise ValueError(
+                    "Instance %d: missing columns %s, unknown columns %s"
+                    % (i, sorted(missing), sorted(unknown))
+                )
+            rows.append([instance[name] for name in columns])
+    elif "rows" in payload:
+        rows = payload["rows"]
+        if not isinstance(rows, list) or not all(isinstance(r, list) for r in rows):
+            raise ValueError('"rows" must be a list of lists')
+    else:
+        raise ValueError('Request body must contain "instances" or "rows"')
+
+    try:
+        matrix = np.asarray(rows, dtype=np.float64)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Feature values must be numbers: %s" % exc) from exc
+    if matrix.ndim != 2 or matrix.shape[1] != len(columns) or len(matrix) == 0:
+        raise ValueError(
+            "Expected a non-empty list of rows with %d columns %s"
+            % (len(columns), columns)
+        )
+    return matrix
+
+
+class ServingStats:
+    """Thread-safe latency and throughput counters of the server"""
+
+    def __init__(self, window: int = 10000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+
+    def record_request(self, latency: float, rows: int) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self.requests += 1
+            self.rows += rows
+
+    def record_batch(self) -> None:
+        with self._lock:
+            self.batches += 1
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = np.array(self._latencies)
+            elapsed = time.perf_counter() - self._started
+            p50, p99 = (
+                np.percentile(latencies, [50, 99]) * 1000
+                if len(latencies)
+                else (0.0, 0.0)
+            )
+            return {
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": self.batches,
+                "errors": self.errors,
+                "latency_p50_ms": float(p50),
+                "latency_p99_ms": float(p99),
+                "requests_per_s": self.requests / elapsed,
+                "rows_per_s": self.rows / elapsed,
+                "mean_batch_requests": self.requests / max(self.batches, 1),
+            }
+
+
+class _Request:
+    def __init__(self, rows: np.ndarray):
+        self.rows = rows
+        self.preds = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Groups concurrent prediction requests into batches. A batch is scored as
+    soon as it holds ``max_batch_size`` rows or as soon as its first request
+    has waited ``max_latency_ms`` milliseconds.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        columns: List[str],
+        stats: ServingStats,
+        max_batch_size: int = 4096,
+        max_latency_ms: float = 5.0,
+        quantile_model: Any = None,
+    ):
+        self._model = model
+        self._quantile_model = quantile_model
+        self._columns = columns
+        self._stats = stats
+        self._max_batch_size = max_batch_size
+        self._max_latency = max_latency_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def predict(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Scores rows with the next batch
+        Returns:
+            The "predictions" of the rows, and their "quantiles" (one column
+            per quantile) when the batcher has a quantile model
+        """
+        if self._closed:
+            raise RuntimeError("The micro-batcher is closed")
+        request = _Request(rows)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.preds
+
+    def close(self) -> None:
+        """
+        Scores the requests already queued, then stops the batching thread
+        """
+        if self._closed:
+            return
+        self._closed = True
+        # None marks the end of the queue for the batching thread
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self) -> List[_Request]:
+        request = self._queue.get()
+        if request is None:
+            return []
+        batch = [request]
+        size = len(request.rows)
+        deadline = time.perf_counter() + self._max_latency
+        while size < self._max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                # Scores the batch before stopping on the next collection
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.rows)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            try:
+                matrix = np.concatenate([request.rows for request in batch])
+                df = pd.DataFrame(matrix, columns=self._columns)
+                outputs = {"predictions": self._model.predict(df)}
+                if self._quantile_model is not None:
+                    outputs["quantiles"] = self._quantile_model.predict(df).reshape(
+                        len(df), -1
+                    )
+                offsets = np.cumsum([len(request.rows) for request in batch])[:-1]
+                for request in batch:
+                    request.preds = {}
+                for key, preds in outputs.items():
+                    for request, request_preds in zip(batch, np.split(preds, offsets)):
+                        request.preds[key] = request_preds
+            except Exception as exc:  # pylint: disable=broad-except
+                for request in batch:
+                    request.error = exc
+            self._stats.record_batch()
+            for request in batch:
+                request.done.set()
+
+
+class _PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 refuses connections under concurrency
+    request_queue_size = 1024
+    batcher = None
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+def create_server(
+    model: Any,
+    columns: List[str],
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    max_batch_size: int = 4096,
+    max_latency_ms: float = 5.0,
+    quantile_model: Any = None,
+) -> ThreadingHTTPServer:
+    """
+    Creates the prediction server without starting it
+    Args:
+        model: A trained XGBoost regression model
+        columns: Training column order
+        host: Interface to listen on
+        port: Port to listen on, 0 picks a free port
+        max_batch_size: Maximum number of rows scored in one model call
+        max_latency_ms: Maximum time a request waits for its batch to fill up
+        quantile_model: A trained XGBoost quantile regression model, whose
+        quantiles are returned along with the predictions
+    Returns:
+        An HTTP server, to be started with ``serve_forever``
+    """
+    stats = ServingStats()
+    batcher = MicroBatcher(
+        model, columns, stats, max_batch_size, max_latency_ms, quantile_model
+    )
+    levels = None if quantile_model is None else quantile_levels(quantile_model)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):  # noqa: N802
+            if self.path == "/metrics":
+                self._send(200, stats.snapshot())
+            elif self.path == "/health":
+                self._send(200, {"status": "ok", "columns": columns})
+            else:
+                self._send(404, {"error": "Unknown path %s" % self.path})
+
+        def do_POST(self):  # noqa: N802
+            if self.path != "/predict":
+                self._send(404, {"error": "Unknown path %s" % self.path})
+                return
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                rows = validate_rows(payload, columns)
+            except ValueError as exc:
+                stats.record_error()
+                self._send(400, {"error": str(exc)})
+                return
+            try:
+                preds = batcher.predict(rows)
+            except Exception as exc:  # pylint: disable=broad-except
+                stats.record_error()
+                self._send(500, {"error": str(exc)})
+                return
+            stats.record_request(time.perf_counter() - start, len(rows))
+            body = {"predictions": preds["predictions"].tolist()}
+            if levels is not None:
+                body["quantile_levels"] = levels
+                body["quantiles"] = preds["quantiles"].tolist()
+            self._send(200, body)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            pass
+
+    server = _PredictionServer((host, port), Handler)
+    server.stats = stats
+    server.batcher = batcher
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="data/07_model_output/model.ubj")
+    parser.add_argument(
+        "--quantile-model",
+        default=None,
+        help="Also serve the quantiles of e.g. data/07_model_output/quantile_model.ubj",
+    )
+    parser.add_argument("--columns", default="data/03_primary/clouds_trn_x.parquet")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-batch-size", type=int, default=4096)
+    parser.add_argument("--max-latency-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    server = create_server(
+        load_model(args.model),
+        load_columns(args.columns),
+        host=args.host,
+        port=args.port,
+        max_batch_size=args.max_batch_size,
+        max_latency_ms=args.max_latency_ms,
+        quantile_model=load_model(args.quantile_model) if args.quantile_model else None,
+    )
+    print("Serving predictions on http://%s:%d" % server.server_address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,7 @@ from setuptools import find_packages, setup
 entry_point = (
     "minipro = minipro.__main__:main"
 )
+serve_entry_point = "minipro-serve = minipro.serve:main"
 
 
 # get the dependencies and installs
@@ -48,7 +49,7 @@ setup(
     name="minipro",
     version="0.1",
     packages=find_packages(exclude=["tests"]),
-    entry_points={"console_scripts": [entry_point]},
+    entry_points={"console_scripts": [entry_point, serve_entry_point]},
     install_requires=requires,
     extras_require={
         "docs": [
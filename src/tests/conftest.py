@@ -0,0 +1,44 @@
+"""
+Shared fixtures of the tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from tests.corpus import write_raw_corpus
+
+
+def pytest_collection_modifyitems(config, items):
+    # The performance tests only run when selected, e.g. with -m perf
+    if "perf" in (config.getoption("markexpr") or ""):
+        return
+    skip_perf = pytest.mark.skip(reason="performance test, select it with -m perf")
+    for item in items:
+        if item.get_closest_marker("perf") is not None:
+            item.add_marker(skip_perf)
+
+
+@pytest.fixture
+def clouds_x():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(500, 3)), columns=["re_liq", "ctt", "cape"])
+    df["month"] = rng.integers(1, 13, len(df))
+    return df
+
+
+@pytest.fixture
+def model(clouds_x):
+    y = 2 * clouds_x["re_liq"] - clouds_x["ctt"]
+    return xgb.XGBRegressor(
+        n_estimators=10,
+        max_depth=3,
+        learning_rate=0.2,
+        subsample=0.8,
+        colsample_bytree=0.9,
+    ).fit(clouds_x, y)
+
+
+@pytest.fixture
+def raw_corpus(tmp_path):
+    return write_raw_corpus(tmp_path, ["20050101", "20050102", "20060101", "20070101"])
@@ -0,0 +1,72 @@
+"""
+Synthetic raw data of the data preparation pipeline, shared by the tests
+"""
+from pathlib import Path
+
+import numpy as np
+
+
+def write_raw_corpus(root: Path, days, n_rows: int = 200, seed: int = 0):
+    """
+    Writes synthetic MPS and ERA data files, one pair per day, with the
+    layout of the raw data of the data preparation pipeline
+    Args:
+        root: Folder in which the "mps" and "era" folders are created
+        days: Days of the data files, as "YYYYMMDD" strings
+        n_rows: Number of cloud objects per file
+        seed: Seed of the random number generator
+    Returns:
+        The MPS and ERA folders, with a trailing slash as in the parameters
+    """
+    rng = np.random.default_rng(seed)
+    dir_mps, dir_era = root / "mps", root / "era"
+    dir_mps.mkdir(parents=True, exist_ok=True)
+    dir_era.mkdir(parents=True, exist_ok=True)
+
+    def uniform(low, high):
+        return rng.uniform(low, high, n_rows)
+
+    def counts(high):
+        return rng.integers(0, high, n_rows).astype(float)
+
+    for day in days:
+        mps = [
+            np.full(n_rows, float(day + "1200")),  # date
+            uniform(20, 500),  # area
+            uniform(0, 20),  # tau
+            uniform(0, 1),  # std_tau
+            uniform(0, 1),  # re
+            uniform(0, 1),  # std_re
+            uniform(230, 280),  # ctt
+            uniform(0, 1),  # std_ctt
+            uniform(0, 1),  # cth_mp
+            uniform(0, 1),  # std_cth
+            uniform(0, 1),  # perim
+            counts(100),  # nb_ice
+            counts(100),  # nb_liq
+            uniform(5e-6, 2e-5),  # re_liq
+            uniform(1e-5, 5e-5),  # re_ice
+            np.zeros(n_rows),  # off1
+            counts(20),  # nb_pocket_ice
+            uniform(1, 50),  # size_pocket_ice
+            uniform(0, 1),  # size_pocket_std_ice
+            counts(20),  # nb_pocket_liq
+            uniform(1, 50),  # size_pocket_liq
+            uniform(0, 1),  # size_pocket_std_liq
+            uniform(0, 1),  # tau_liq
+            uniform(0, 1),  # tau_ice
+            uniform(-60, 60),  # lon
+            uniform(-70, -40),  # lat
+            uniform(220, 250),  # min_ctt
+            uniform(250, 280),  # max_ctt
+        ]
+        era = [
+            np.zeros(n_rows),  # off2
+            uniform(0, 500),  # cape
+            rng.normal(size=n_rows),  # omega
+            uniform(270, 290),  # sst
+            np.zeros(n_rows),  # off3
+        ]
+        np.savetxt(dir_mps / (day + ".txt"), np.column_stack(mps), fmt="%.8g")
+        np.savetxt(dir_era / (day + "_CAPE.txt"), np.column_stack(era), fmt="%.8g")
+    return str(dir_mps) + "/", str(dir_era) + "/"
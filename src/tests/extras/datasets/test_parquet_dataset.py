@@ -0,0 +1,25 @@
+"""
+Tests for the dataset loading Parquet files as Parquet tables
+"""
+import pandas as pd
+import pytest
+from kedro.io import DataSetError
+
+from minipro.extras.datasets.parquet_dataset import ParquetTableDataSet
+from minipro.extras.parquet import ParquetTable
+
+
+def test_load_is_lazy_and_save_is_refused(tmp_path):
+    filepath = tmp_path / "clouds_trn_x.parquet"
+    data_set = ParquetTableDataSet(str(filepath))
+    assert not data_set.exists()
+    df = pd.DataFrame({"re_liq": [1.0, 2.0, 3.0], "ctt": [250.0, 260.0, 270.0]})
+    df.to_parquet(filepath)
+    assert data_set.exists()
+
+    table = data_set.load()
+    assert isinstance(table, ParquetTable)
+    assert len(table) == 3
+    pd.testing.assert_frame_equal(table.read(1, 3), df.iloc[1:3])
+    with pytest.raises(DataSetError, match="read-only"):
+        data_set.save(df)
@@ -0,0 +1,61 @@
+"""
+Tests for the dataset saving XGBoost models in the native XGBoost format
+"""
+import numpy as np
+import pytest
+import xgboost as xgb
+from kedro.io import DataSetError
+
+from minipro.extras.datasets.xgboost_dataset import XGBoostModelDataSet
+
+
+@pytest.mark.parametrize("suffix", [".ubj", ".json"])
+def test_save_and_load(tmp_path, clouds_x, model, suffix):
+    data_set = XGBoostModelDataSet(str(tmp_path / ("model" + suffix)))
+    assert not data_set.exists()
+    data_set.save(model)
+    assert data_set.exists()
+
+    reloaded = data_set.load()
+    np.testing.assert_allclose(reloaded.predict(clouds_x), model.predict(clouds_x))
+    params = reloaded.get_xgb_params()
+    assert params["max_depth"] == 3
+    assert params["learning_rate"] == pytest.approx(0.2)
+    assert params["subsample"] == pytest.approx(0.8)
+    assert params["colsample_bytree"] == pytest.approx(0.9)
+
+
+def test_load_args_override_saved_params(tmp_path, model):
+    filepath = str(tmp_path / "model.ubj")
+    XGBoostModelDataSet(filepath).save(model)
+    reloaded = XGBoostModelDataSet(filepath, load_args={"n_jobs": 3}).load()
+    assert reloaded.get_params()["n_jobs"] == 3
+
+
+def test_metadata_is_read_without_the_booster(tmp_path, model):
+    model.get_booster().set_attr(training_data_hash="abc")
+    data_set = XGBoostModelDataSet(str(tmp_path / "model.ubj"))
+    data_set.save(model)
+    metadata = data_set.load_metadata()
+    assert metadata["feature_names"] == ["re_liq", "ctt", "cape", "month"]
+    assert metadata["num_trees"] == 10
+    assert metadata["training_data_hash"] == "abc"
+    assert metadata["quantiles"] == []
+
+
+def test_formats_do_not_share_their_metadata(tmp_path, clouds_x, model):
+    XGBoostModelDataSet(str(tmp_path / "model.ubj")).save(model)
+    other = xgb.XGBRegressor(n_estimators=5, max_depth=2).fit(clouds_x, clouds_x["ctt"])
+    XGBoostModelDataSet(str(tmp_path / "model.json")).save(other)
+    assert (tmp_path / "model.ubj.meta.json").exists()
+    assert XGBoostModelDataSet(str(tmp_path / "model.ubj")).load_metadata()[
+        "num_trees"
+    ] == 10
+    assert XGBoostModelDataSet(str(tmp_path / "model.json")).load_metadata()[
+        "num_trees"
+    ] == 5
+
+
+def test_unsupported_suffix():
+    with pytest.raises(DataSetError):
+        XGBoostModelDataSet("model.pkl")
@@ -0,0 +1,57 @@
+"""
+Tests for the lazy access to the rows of a Parquet file
+"""
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from minipro.extras.parquet import ParquetTable
+
+
+@pytest.fixture
+def clouds(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(1000, 3)), columns=["re_liq", "ctt", "cape"])
+    # Shuffled like a train set, so the index is saved as a column
+    df = df.sample(frac=1, random_state=0)
+    df.to_parquet(tmp_path / "clouds.parquet", row_group_size=128)
+    return df, ParquetTable(str(tmp_path / "clouds.parquet"))
+
+
+def test_layout_from_the_footer(clouds):
+    df, table = clouds
+    assert len(table) == len(df)
+    assert table.columns == list(df.columns)
+    assert table.row_group_sizes == [128] * 7 + [104]
+
+
+@pytest.mark.parametrize(
+    "start, stop", [(0, None), (100, 300), (127, 129), (990, 2000)]
+)
+def test_read_a_range_of_rows(clouds, start, stop):
+    df, table = clouds
+    pd.testing.assert_frame_equal(table.read(start, stop), df.iloc[start:stop])
+
+
+def test_read_columns_and_empty_ranges(clouds):
+    df, table = clouds
+    pd.testing.assert_frame_equal(table.read(10, 20, ["ctt"]), df.iloc[10:20][["ctt"]])
+    assert list(table.read(500, 500).columns) == list(df.columns)
+    assert len(table.read(500, 500)) == 0
+
+
+def test_row_groups_and_pickling(clouds):
+    df, table = clouds
+    pd.testing.assert_frame_equal(pd.concat(table.iter_row_groups()), df)
+    unpickled = pickle.loads(pickle.dumps(table))
+    pd.testing.assert_frame_equal(unpickled.read(5, 10), df.iloc[5:10])
+
+
+def test_range_index_of_a_range_of_rows(tmp_path):
+    df = pd.DataFrame({"re_liq": np.arange(10.0)}, index=pd.RangeIndex(5, 25, 2))
+    df.to_parquet(tmp_path / "clouds.parquet", row_group_size=3)
+    table = ParquetTable(str(tmp_path / "clouds.parquet"))
+    pd.testing.assert_frame_equal(table.read(2, 7), df.iloc[2:7])
+    pd.testing.assert_frame_equal(pd.concat(table.iter_row_groups()), df)
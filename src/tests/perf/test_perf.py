@@ -0,0 +1,262 @@
+"""
+Performance regression tests of the pipeline nodes on a fixed synthetic
+MPS/ERA corpus. The throughput of each node (rows per second, best of a few
+runs) is divided by the speed of a fixed NumPy/pandas calibration workload
+run in the same session, so the baseline holds ratios that do not depend on
+the speed of the machine. For the nodes whose memory is allocated by Python,
+NumPy or pandas, the peak memory measured with tracemalloc is compared as
+well; XGBoost allocates natively, out of sight of tracemalloc, so the memory
+of training and prediction is not checked. A node fails when its relative
+throughput drops, or its peak memory grows, by more than the tolerance of
+``baseline.json``, and the test prints a table of the measured and baseline
+values.
+
+The tests only run when selected: ``pytest -m perf``.
+
+Environment variables:
+    MINIPRO_PERF_TOLERANCE  Overrides the relative tolerance of the baseline
+    MINIPRO_PERF_UPDATE     Set to 1 to write the measured values into
+                            ``baseline.json`` instead of comparing them
+"""
+import io
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from minipro.pipelines.data_engineering.nodes import split_data
+from minipro.pipelines.data_preparation.nodes import preprocess
+from minipro.pipelines.data_science.nodes import train_model, train_quantile_model
+from tests.corpus import write_raw_corpus
+
+pytestmark = pytest.mark.perf
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+UPDATE_BASELINE = os.environ.get("MINIPRO_PERF_UPDATE") == "1"
+
+# Fixed corpus and settings, the baseline is only valid for these
+CORPUS_DAYS = ["200501%02d" % day for day in range(1, 9)]
+CORPUS_ROWS_PER_DAY = 2000
+REPEATS = 5
+# Allowed growth of the peak memory on top of the tolerance, as the small
+# allocations of the interpreter and of the libraries vary between runs
+MEMORY_SLACK_MB = 1.0
+MODEL_PARAMS = {
+    "n_estimators": 20,
+    "max_depth": 5,
+    "learning_rate": 0.1,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "n_jobs": 2,
+    "quantiles": [0.1, 0.5, 0.9],
+}
+
+
+def _best_time(func: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def calibrate() -> float:
+    """
+    Runs a fixed workload mixing the operations of the nodes: parsing text,
+    group-by aggregations and sorting
+    Returns:
+        The number of runs of the workload per second, best of a few runs
+    """
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {"key": rng.integers(0, 1000, 100000), "value": rng.normal(size=100000)}
+    )
+    text = df.to_csv(index=False)
+
+    def workload():
+        parsed = pd.read_csv(io.StringIO(text))
+        parsed.groupby("key")["value"].agg(["mean", "std"])
+        np.sort(parsed["value"].to_numpy())
+
+    return 1 / _best_time(workload)
+
+
+def measure(
+    func: Callable[[], Any], n_rows: int, calibration: float, memory: bool = True
+) -> Dict[str, float]:
+    """
+    Measures the throughput, and optionally the peak memory, of a function
+    Args:
+        func: Function to measure, called without arguments
+        n_rows: Number of rows processed by one call of the function
+        calibration: Runs per second of the calibration workload
+        memory: Whether to measure the peak memory with tracemalloc
+    Returns:
+        The "relative_throughput" (rows per second divided by the runs per
+        second of the calibration workload) and the "peak_memory_mb" of the
+        function
+    """
+    measured = {}
+    if memory:
+        # Tracing allocations slows the function down, so it is timed apart
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        measured["peak_memory_mb"] = peak / 2 ** 20
+    measured["relative_throughput"] = n_rows / _best_time(func) / calibration
+    return measured
+
+
+def compare(
+    stage: str, measured: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> Tuple[bool, List[str]]:
+    """
+    Compares the measured values of a node with its baseline
+    Returns:
+        Whether all values are within the tolerance, and the lines of a table
+        of the measured and baseline values
+    """
+    limits = {"relative_throughput": baseline["relative_throughput"] * (1 - tolerance)}
+    if "peak_memory_mb" in baseline:
+        limits["peak_memory_mb"] = (
+            baseline["peak_memory_mb"] * (1 + tolerance) + MEMORY_SLACK_MB
+        )
+    lines = [
+        "Performance of %s (tolerance %.0f%%):" % (stage, tolerance * 100),
+        "  %-20s %12s %12s %8s %12s" % ("", "baseline", "measured", "change", "limit"),
+    ]
+    passed = True
+    for metric, limit in limits.items():
+        ok = (
+            measured[metric] >= limit
+            if metric == "relative_throughput"
+            else measured[metric] <= limit
+        )
+        passed = passed and ok
+        lines.append(
+            "%s %-20s %12.2f %12.2f %+7.0f%% %12.2f"
+            % (
+                " " if ok else "!",
+                metric,
+                baseline[metric],
+                measured[metric],
+                (measured[metric] / baseline[metric] - 1) * 100,
+                limit,
+            )
+        )
+    return passed, lines
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    yield baseline
+    if UPDATE_BASELINE:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+
+
+@pytest.fixture(scope="module")
+def calibration():
+    return calibrate()
+
+
+@pytest.fixture(scope="module")
+def check(baseline):
+    tolerance = float(os.environ.get("MINIPRO_PERF_TOLERANCE", baseline["tolerance"]))
+
+    def check(stage: str, measured: Dict[str, float]) -> None:
+        if UPDATE_BASELINE:
+            baseline["stages"][stage] = {k: round(v, 2) for k, v in measured.items()}
+            return
+        if stage not in baseline["stages"]:
+            pytest.skip(
+                "No baseline for %s, record it with MINIPRO_PERF_UPDATE=1" % stage
+            )
+        passed, lines = compare(stage, measured, baseline["stages"][stage], tolerance)
+        print("\n".join(lines))
+        if not passed:
+            pytest.fail("\n".join(lines), pytrace=False)
+
+    return check
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    return write_raw_corpus(
+        tmp_path_factory.mktemp("perf_corpus"), CORPUS_DAYS, CORPUS_ROWS_PER_DAY
+    )
+
+
+@pytest.fixture(scope="module")
+def p_clouds(corpus):
+    return preprocess(*corpus)
+
+
+@pytest.fixture(scope="module")
+def split(p_clouds):
+    return split_data(p_clouds, 0.2, ["nb_pocket_ice_over_area"])
+
+
+def train(split: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    models = train_model(split["x_trn"], split["y_trn"], MODEL_PARAMS)
+    models["quantile_model"] = train_quantile_model(
+        split["x_trn"], split["y_trn"], MODEL_PARAMS
+    )
+    return models
+
+
+@pytest.fixture(scope="module")
+def models(split):
+    return train(split)
+
+
+def test_preprocess(corpus, calibration, check):
+    measured = measure(
+        lambda: preprocess(*corpus),
+        len(CORPUS_DAYS) * CORPUS_ROWS_PER_DAY,
+        calibration,
+    )
+    check("preprocess", measured)
+
+
+def test_split_data(p_clouds, calibration, check):
+    measured = measure(
+        lambda: split_data(p_clouds, 0.2, ["nb_pocket_ice_over_area"]),
+        len(p_clouds),
+        calibration,
+    )
+    check("split_data", measured)
+
+
+def test_train_model(split, calibration, check):
+    measured = measure(
+        lambda: train(split),
+        len(split["x_trn"]),
+        calibration,
+        memory=False,
+    )
+    check("train_model", measured)
+
+
+def test_predict(split, models, calibration, check):
+    x_tst = split["x_tst"]
+
+    def predict():
+        models["model"].predict(x_tst)
+        models["quantile_model"].predict(x_tst)
+
+    measured = measure(predict, len(x_tst), calibration, memory=False)
+    check("predict", measured)
@@ -0,0 +1,68 @@
+"""
+Tests for the nodes of the data analysis pipeline
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from minipro.pipelines.data_analysis.nodes import GridAccumulator, build_climatology
+
+PARAMS = {
+    "lat_range": [-70.0, -40.0],
+    "lon_range": [-20.0, 20.0],
+    "lat_step": 10.0,
+    "lon_step": 10.0,
+    "columns": {"re_liq": [0.0, 40.0], "ctt": [200.0, 300.0]},
+    "quantiles": [0.5],
+    "sketch_bins": 400,
+    "chunk_size": 333,
+}
+
+
+@pytest.fixture
+def clouds():
+    rng = np.random.default_rng(0)
+    n = 3000
+    return pd.DataFrame(
+        {
+            "lat": rng.uniform(-70, -40, n),
+            "lon": rng.uniform(-20, 20, n),
+            "month": rng.integers(1, 13, n),
+            "re_liq": rng.uniform(5, 35, n),
+            "ctt": rng.normal(250, 10, n),
+        }
+    )
+
+
+def test_matches_groupby(clouds):
+    df_grid = build_climatology(PARAMS, clouds.iloc[:1000], clouds.iloc[1000:])
+
+    keys = [
+        (clouds["lat"] + 70) // 10 * 10 - 65,
+        (clouds["lon"] + 20) // 10 * 10 - 15,
+        clouds["month"],
+    ]
+    grouped = clouds.groupby(keys)["re_liq"]
+    expected = grouped.agg(["count", "mean", "var"])
+    expected["median"] = grouped.quantile(0.5, interpolation="lower")
+    df_grid = df_grid.set_index(["lat", "lon", "month"]).sort_index()
+    expected = expected.sort_index()
+
+    np.testing.assert_array_equal(df_grid["re_liq_count"], expected["count"])
+    np.testing.assert_allclose(df_grid["re_liq_mean"], expected["mean"])
+    np.testing.assert_allclose(df_grid["re_liq_var"], expected["var"])
+    # The quantile sketch is accurate to a bin width (0.1)
+    np.testing.assert_allclose(df_grid["re_liq_q50"], expected["median"], atol=0.11)
+
+
+def test_no_partitions_raise():
+    with pytest.raises(ValueError, match="No partitions"):
+        build_climatology(PARAMS)
+
+
+def test_rows_outside_grid_are_ignored(clouds):
+    accumulator = GridAccumulator(
+        (-70.0, -40.0), (-20.0, 20.0), 10.0, 10.0, {"re_liq": (0.0, 40.0)}
+    )
+    accumulator.update(clouds.assign(lat=clouds["lat"] - 40))
+    assert accumulator.count.sum() == 0
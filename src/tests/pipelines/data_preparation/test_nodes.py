@@ -0,0 +1,68 @@
+"""
+Tests for the nodes of the data preparation pipeline
+"""
+import json
+import logging
+
+import pandas as pd
+import pytest
+
+from tests.corpus import write_raw_corpus
+
+from minipro.pipelines.data_preparation.nodes import (
+    COL_NAMES,
+    list_partitions,
+    merge_partitions,
+    preprocess,
+    preprocess_partition,
+)
+
+
+@pytest.mark.parametrize("prefetch_depth", [1, 2, 8])
+def test_prefetching_keeps_all_files_in_order(raw_corpus, prefetch_depth):
+    df = preprocess(*raw_corpus, prefetch_depth=prefetch_depth)
+    pd.testing.assert_frame_equal(df, preprocess(*raw_corpus, prefetch_depth=1))
+    assert list(df.columns) == COL_NAMES
+    assert set(df["month"]) == {1}
+
+
+def test_partitions_merge_into_whole_archive(raw_corpus):
+    partitions = [
+        preprocess_partition(*raw_corpus, partition=year)
+        for year in ["2005", "2006", "2007"]
+    ]
+    df = merge_partitions(*partitions)
+    pd.testing.assert_frame_equal(df, preprocess(*raw_corpus))
+
+
+def test_missing_data_files_raise(raw_corpus, tmp_path):
+    with pytest.raises(ValueError, match="No MPS data file"):
+        preprocess_partition(*raw_corpus, partition="2008")
+    with pytest.raises(ValueError, match="No MPS data file"):
+        preprocess(str(tmp_path / "missing") + "/", raw_corpus[1])
+    assert list_partitions(str(tmp_path / "missing")) == []
+    with pytest.raises(ValueError, match="No partitions"):
+        merge_partitions()
+
+
+def test_partitions_match_the_date_prefix(tmp_path):
+    # "20120105" contains "2010" but only belongs to the 2012 partition
+    corpus = write_raw_corpus(tmp_path, ["20100301", "20120105", "20151220"])
+    partitions = list_partitions(corpus[0])
+    assert partitions == ["2010", "2012", "2015"]
+    df = merge_partitions(
+        *[preprocess_partition(*corpus, partition=year) for year in partitions]
+    )
+    pd.testing.assert_frame_equal(df, preprocess(*corpus))
+
+
+def test_prefetch_metrics_are_logged(raw_corpus, caplog):
+    with caplog.at_level(logging.INFO):
+        preprocess_partition(*raw_corpus, partition="2005", prefetch_depth=2)
+    messages = [r.getMessage() for r in caplog.records if "Prefetch" in r.message]
+    metrics = json.loads(messages[-1].split(": ", 1)[1])
+    assert metrics["partition"] == "2005"
+    assert metrics["depth"] == 2
+    assert metrics["prefetch_pairs"] == 2
+    assert metrics["prefetch_max_queue_depth"] <= 2
+    assert metrics["prefetch_stall_time_s"] >= 0
@@ -0,0 +1,49 @@
+"""
+Tests for the data preparation pipeline
+"""
+from pathlib import Path
+
+import yaml
+
+from minipro.pipelines.data_analysis.pipeline import (
+    create_pipeline as create_analysis_pipeline,
+)
+from minipro.pipelines.data_preparation.pipeline import (
+    create_pipeline,
+    partition_catalog,
+    pipeline_partitions,
+)
+
+CATALOG_PATH = Path(__file__).parents[4] / "conf" / "base" / "catalog.yml"
+
+
+def test_partitions_share_the_storage_profile_of_p_clouds():
+    with open(CATALOG_PATH, "r", encoding="utf-8") as f:
+        catalog = yaml.safe_load(f)
+    # Like the config loader, drop the "_" template entries
+    catalog = {k: v for k, v in catalog.items() if not k.startswith("_")}
+
+    entries = partition_catalog(["2010", "2012"], template=catalog["P_clouds"])
+    assert set(entries) == {"P_clouds_2010", "P_clouds_2012"}
+    entry = entries["P_clouds_2010"]
+    assert entry["type"] == catalog["P_clouds"]["type"]
+    assert entry["save_args"] == catalog["P_clouds"]["save_args"]
+    assert entry["save_args"]["compression"] == "lz4"
+    assert entry["filepath"].endswith("clouds_partitions/clouds_2010.parquet")
+    assert catalog["P_clouds"]["filepath"] == "data/02_intermediate/clouds.parquet"
+
+
+def test_one_node_per_partition():
+    pipeline = create_pipeline(["2010", "2012"])
+    assert {n.name for n in pipeline.nodes} == {
+        "preprocess_2010",
+        "preprocess_2012",
+        "merge_partitions",
+    }
+
+
+def test_partitions_of_the_pipeline():
+    pipeline = create_pipeline(["2010", "2012"])
+    assert pipeline_partitions(pipeline) == ["2010", "2012"]
+    assert pipeline_partitions(create_analysis_pipeline(["2012"])) == ["2012"]
+    assert pipeline_partitions(create_pipeline()) == []
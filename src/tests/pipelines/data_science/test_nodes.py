@@ -0,0 +1,224 @@
+"""
+Tests for the nodes of the data science pipeline
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from minipro.extras.parquet import ParquetTable
+from minipro.extras.quantiles import quantile_levels
+from minipro.pipelines.data_science.nodes import (
+    SlicedMetrics,
+    _data_hash,
+    explain_model,
+    partial_dependence,
+    train_model,
+    train_quantile_model,
+)
+
+
+class TestTrainModel:
+    params = {
+        "n_estimators": 20,
+        "max_depth": 3,
+        "learning_rate": 0.3,
+        "subsample": 1.0,
+        "colsample_bytree": 1.0,
+        "n_jobs": 2,
+        "quantiles": [0.9, 0.1, 0.5],
+    }
+
+    def test_quantile_model(self, clouds_x):
+        rng = np.random.default_rng(1)
+        y = (clouds_x["re_liq"] + rng.normal(scale=0.5, size=len(clouds_x))).to_frame(
+            "nb_pocket_ice_over_area"
+        )
+        quantile_model = train_quantile_model(clouds_x, y, self.params)
+        assert quantile_levels(quantile_model) == pytest.approx([0.1, 0.5, 0.9])
+        assert quantile_model.get_booster().attr("training_data_hash") == _data_hash(
+            clouds_x, y
+        )
+        assert quantile_levels(train_model(clouds_x, y, self.params)["model"]) == []
+
+        preds = quantile_model.predict(clouds_x)
+        assert preds.shape == (len(clouds_x), 3)
+        assert np.mean(preds[:, 0] <= preds[:, 2]) > 0.95
+        below = (y.to_numpy() <= preds).mean(axis=0)
+        np.testing.assert_allclose(below, [0.1, 0.5, 0.9], atol=0.1)
+
+    def test_targets_share_one_matrix(self, clouds_x):
+        y = pd.DataFrame(
+            {"a": clouds_x["re_liq"] * 2, "b": clouds_x["ctt"] - clouds_x["cape"]}
+        )
+        models = train_model(clouds_x, y, self.params)
+        for target in ["a", "b"]:
+            reference = xgb.XGBRegressor(
+                n_estimators=20,
+                max_depth=3,
+                learning_rate=0.3,
+                subsample=1.0,
+                colsample_bytree=1.0,
+            ).fit(clouds_x, y[target])
+            model = models["target_models"][target]
+            np.testing.assert_allclose(
+                model.predict(clouds_x), reference.predict(clouds_x), rtol=1e-5
+            )
+            assert model.get_booster().attr("training_data_hash") == _data_hash(
+                clouds_x, y[[target]]
+            )
+
+    def test_distributed_training_matches_in_process(self, clouds_x, tmp_path):
+        rng = np.random.default_rng(2)
+        y = (
+            2 * clouds_x["re_liq"] + rng.normal(scale=0.1, size=len(clouds_x))
+        ).to_frame("nb_pocket_ice_over_area")
+        local = train_model(clouds_x, y, self.params)
+        local["quantile_model"] = train_quantile_model(clouds_x, y, self.params)
+        # The workers read their rows from the Parquet files of the train set
+        clouds_x.to_parquet(tmp_path / "x.parquet", row_group_size=64)
+        y.to_parquet(tmp_path / "y.parquet", row_group_size=64)
+        x_table = ParquetTable(str(tmp_path / "x.parquet"))
+        y_table = ParquetTable(str(tmp_path / "y.parquet"))
+        params = dict(self.params, n_workers=2)
+        distributed = train_model(x_table, y_table, params)
+        distributed["quantile_model"] = train_quantile_model(x_table, y_table, params)
+
+        for key in ["model", "quantile_model"]:
+            filepath = str(tmp_path / (key + ".ubj"))
+            distributed[key].save_model(filepath)
+            reloaded = xgb.XGBRegressor()
+            reloaded.load_model(filepath)
+            # The shards are binned with merged quantile sketches, so the
+            # trees can differ slightly from the in-process ones
+            difference = reloaded.predict(clouds_x) - local[key].predict(clouds_x)
+            assert np.abs(difference).mean() < 0.05 * y.values.std()
+            assert reloaded.get_booster().attr("training_data_hash") == _data_hash(
+                clouds_x, y
+            )
+
+    @pytest.mark.parametrize("quantiles", [[], [0.5], [0.1, 1.0]])
+    def test_rejects_invalid_quantiles(self, clouds_x, quantiles):
+        with pytest.raises(ValueError, match="at least two quantiles"):
+            train_quantile_model(
+                clouds_x, clouds_x[["re_liq"]], dict(self.params, quantiles=quantiles)
+            )
+
+
+class TestExplainModel:
+    def test_cache_depends_on_sampling_and_test_set(self, clouds_x, tmp_path):
+        x = clouds_x.assign(band=(clouds_x["ctt"] > 0).astype(int))
+        model = xgb.XGBRegressor(n_estimators=10, max_depth=3).fit(x, x["re_liq"])
+        params = {
+            "sample_size": 100,
+            "stratify_by": "month",
+            "chunk_size": 30,
+            "n_jobs": 2,
+            "random_state": 42,
+            "cache_dir": str(tmp_path),
+        }
+        df_contribs = explain_model(x, model, params)
+        assert abs(len(df_contribs) - 100) <= 12
+        np.testing.assert_allclose(
+            df_contribs.sum(axis=1),
+            model.predict(x.loc[df_contribs.index]),
+            rtol=1e-4,
+            atol=1e-4,
+        )
+        pd.testing.assert_frame_equal(explain_model(x, model, params), df_contribs)
+        assert len(list(tmp_path.iterdir())) == 1
+
+        explain_model(x, model, dict(params, stratify_by="band"))
+        explain_model(x.iloc[:400], model, params)
+        assert len(list(tmp_path.iterdir())) == 3
+
+
+class TestPartialDependence:
+    params = {
+        "features": ["re_liq", "ctt"],
+        "grid_size": 5,
+        "sample_size": 40,
+        "random_state": 42,
+    }
+
+    def test_shape(self, clouds_x, model):
+        df_pdp = partial_dependence(clouds_x, model, self.params)
+        assert len(df_pdp) == 2 * 5 * 40
+        assert set(df_pdp["feature"]) == {"re_liq", "ctt"}
+        assert df_pdp.groupby(["feature", "grid_value"]).size().eq(40).all()
+
+    def test_grid_ignores_missing_values(self, clouds_x, model):
+        clouds_x = clouds_x.copy()
+        clouds_x.loc[clouds_x.index[::3], "ctt"] = np.nan
+        df_pdp = partial_dependence(clouds_x, model, self.params)
+        assert df_pdp["grid_value"].notna().all()
+        assert df_pdp[df_pdp["feature"] == "ctt"]["grid_value"].nunique() == 5
+
+    def test_matches_row_wise_predictions(self, clouds_x, model):
+        df_pdp = partial_dependence(clouds_x, model, self.params)
+        df_sample = clouds_x.sample(40, random_state=42)
+        df_ice = df_pdp[df_pdp["feature"] == "ctt"]
+        for value, df_grid in df_ice.groupby("grid_value"):
+            df_sample_grid = df_sample.assign(ctt=value)
+            np.testing.assert_allclose(
+                df_grid.sort_values("sample_id")["prediction"],
+                model.predict(df_sample_grid),
+                rtol=1e-6,
+            )
+
+
+class TestSlicedMetrics:
+    slices = {"month": {"column": "month", "edges": [1, 7, 13]}}
+
+    def test_matches_sklearn_in_chunks(self, clouds_x, model):
+        y = clouds_x["re_liq"].to_numpy()
+        preds = model.predict(clouds_x)
+        metrics = SlicedMetrics(self.slices)
+        for i in range(0, len(clouds_x), 128):
+            chunk = slice(i, i + 128)
+            metrics.update(clouds_x.iloc[chunk], y[chunk], preds[chunk])
+        df_report = metrics.to_frame().set_index(["slice", "bin"])
+
+        winter = (clouds_x["month"] >= 7).to_numpy()
+        for key, mask in [(("all", "all"), slice(None)), (("month", "7_13"), winter)]:
+            row = df_report.loc[key]
+            assert row["count"] == len(y[mask])
+            assert row["mse"] == pytest.approx(mean_squared_error(y[mask], preds[mask]))
+            assert row["mae"] == pytest.approx(
+                mean_absolute_error(y[mask], preds[mask])
+            )
+            assert row["r2"] == pytest.approx(r2_score(y[mask], preds[mask]))
+            assert row["bias"] == pytest.approx(np.mean(preds[mask] - y[mask]))
+
+    def test_mlflow_metric_names(self, clouds_x, model):
+        metrics = SlicedMetrics(self.slices)
+        metrics.update(clouds_x, clouds_x["re_liq"], model.predict(clouds_x))
+        names = metrics.to_mlflow_metrics()
+        assert {"test_mse", "test_r2", "mse/month/1_7", "bias/month/7_13"} <= set(names)
+
+    def test_interval_coverage(self, clouds_x, model):
+        y = clouds_x["re_liq"].to_numpy()
+        preds = model.predict(clouds_x)
+        lower, upper = preds - 0.5, preds + 1.0
+        metrics = SlicedMetrics(self.slices)
+        for i in range(0, len(clouds_x), 128):
+            chunk = slice(i, i + 128)
+            metrics.update(
+                clouds_x.iloc[chunk], y[chunk], preds[chunk], lower[chunk], upper[chunk]
+            )
+        df_report = metrics.to_frame().set_index(["slice", "bin"])
+
+        winter = (clouds_x["month"] >= 7).to_numpy()
+        covered = (y >= lower) & (y <= upper)
+        row = df_report.loc[("month", "7_13")]
+        assert row["coverage"] == pytest.approx(covered[winter].mean())
+        assert row["interval_width"] == pytest.approx(1.5)
+        assert "coverage/month/1_7" in metrics.to_mlflow_metrics()
+
+    def test_no_interval_columns_without_intervals(self, clouds_x, model):
+        metrics = SlicedMetrics(self.slices)
+        metrics.update(clouds_x, clouds_x["re_liq"], model.predict(clouds_x))
+        assert "coverage" not in metrics.to_frame()
+        assert "test_coverage" not in metrics.to_mlflow_metrics()
@@ -0,0 +1,37 @@
+"""
+Tests for the data science pipeline
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from minipro.pipelines.data_science.pipeline import create_pipeline
+
+PARAMS = {
+    "n_estimators": 5,
+    "max_depth": 3,
+    "learning_rate": 0.3,
+    "subsample": 1.0,
+    "colsample_bytree": 1.0,
+    "n_jobs": 2,
+    "quantiles": [0.1, 0.9],
+}
+
+
+@pytest.mark.parametrize("quantiles", [False, True])
+def test_node_outputs_match_the_pipeline(quantiles):
+    pipeline = create_pipeline(quantiles=quantiles)
+    assert ("quantile_model" in pipeline.all_outputs()) == quantiles
+    assert "quantile_model" not in pipeline.inputs()
+
+    rng = np.random.default_rng(0)
+    x = pd.DataFrame(rng.normal(size=(200, 3)), columns=["re_liq", "ctt", "cape"])
+    inputs = {
+        "P_clouds_trn_x@table": x,
+        "P_clouds_trn_y@table": x[["re_liq"]],
+        "params:model": PARAMS,
+    }
+    for node in pipeline.nodes:
+        if node.name in ("train", "train_quantiles"):
+            outputs = node.run(inputs)
+            assert set(outputs) == set(node.outputs)
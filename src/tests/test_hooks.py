@@ -0,0 +1,75 @@
+"""
+Tests for the project hooks
+"""
+import pytest
+from kedro.io import MemoryDataSet
+from kedro.pipeline import node
+
+from minipro.hooks import PROFILE_ENV_VAR, ProjectHooks
+from minipro.pipelines import data_analysis as da
+from minipro.pipelines import data_preparation as dp
+
+
+def identity(x):
+    return x
+
+
+NODE = node(identity, "x", "y", name="identity")
+
+CATALOG = {
+    "P_clouds": {
+        "type": "pandas.ParquetDataSet",
+        "filepath": "data/02_intermediate/clouds.parquet",
+        "save_args": {"compression": "lz4"},
+    },
+    "P_clouds_2012": {"type": "MemoryDataSet"},
+}
+
+
+def test_partitions_of_the_pipeline_are_persisted():
+    hooks = ProjectHooks()
+    catalog = hooks.register_catalog(CATALOG, {}, {}, None, None)
+    pipeline = dp.create_pipeline(["2010", "2012"]) + da.create_pipeline(["2010"])
+    hooks.before_pipeline_run({}, pipeline, catalog)
+
+    description = catalog._data_sets["P_clouds_2010"]._describe()
+    assert description["filepath"].endswith("clouds_partitions/clouds_2010.parquet")
+    assert description["save_args"]["compression"] == "lz4"
+    # The entries of conf/ take precedence
+    assert isinstance(catalog._data_sets["P_clouds_2012"], MemoryDataSet)
+    assert "P_clouds_2011" not in catalog.list()
+
+
+def test_profiling_is_off_by_default(monkeypatch):
+    monkeypatch.delenv(PROFILE_ENV_VAR, raising=False)
+    hooks = ProjectHooks()
+    catalog = hooks.register_catalog({}, {}, {}, None, None)
+    hooks.before_pipeline_run({}, dp.create_pipeline(), catalog)
+    hooks.before_node_run(NODE, "run_1")
+    hooks.after_node_run(NODE, "run_1")
+    assert hooks._profiler is None
+
+
+@pytest.mark.parametrize("hook", ["after_node_run", "on_node_error"])
+def test_profiling_parameters_enable_the_profiler(tmp_path, monkeypatch, hook):
+    monkeypatch.delenv(PROFILE_ENV_VAR, raising=False)
+    hooks = ProjectHooks()
+    catalog = hooks.register_catalog({}, {}, {}, None, None)
+    params = {"enabled": True, "interval_ms": 1, "output_dir": str(tmp_path)}
+    catalog.add("params:profiling", MemoryDataSet(params))
+    hooks.before_pipeline_run({}, dp.create_pipeline(), catalog)
+    hooks.before_node_run(NODE, "run_1")
+    getattr(hooks, hook)(NODE, "run_1")
+    assert list((tmp_path / "run_1").glob("identity*.collapsed"))
+
+
+def test_profiling_environment_variable_outside_of_the_pipeline_run(
+    tmp_path, monkeypatch
+):
+    # The nodes run by ParallelRunner do not go through before_pipeline_run
+    monkeypatch.setenv(PROFILE_ENV_VAR, "1")
+    monkeypatch.chdir(tmp_path)
+    hooks = ProjectHooks()
+    hooks.before_node_run(NODE, "run_1")
+    hooks.after_node_run(NODE, "run_1")
+    assert list((tmp_path / "logs" / "profiles" / "run_1").glob("*.collapsed"))
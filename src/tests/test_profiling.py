@@ -0,0 +1,47 @@
+"""
+Tests for the sampling profiler of the nodes
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from minipro.profiling import NodeProfiler, StackSampler
+
+
+def busy_worker(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_sampler_sees_the_threads_of_a_pool():
+    sampler = StackSampler(interval=0.001).start()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(busy_worker, [0.2, 0.2]))
+    counts = sampler.stop()
+
+    worker_samples = sum(
+        count for stack, count in counts.items() if "busy_worker (" in stack
+    )
+    assert worker_samples > 10
+    assert not any("_run (profiling.py" in stack for stack in counts)
+
+
+def test_collapsed_stack_format(tmp_path):
+    sampler = StackSampler()
+    sampler.counts.update({"main (a.py:1);f (a.py:5)": 3, "main (a.py:1)": 1})
+    sampler.write_collapsed(tmp_path / "profile" / "node.collapsed")
+    lines = (tmp_path / "profile" / "node.collapsed").read_text().splitlines()
+    assert lines == ["main (a.py:1);f (a.py:5) 3", "main (a.py:1) 1"]
+
+
+def test_node_profiler_writes_one_file_per_node(tmp_path):
+    profiler = NodeProfiler(str(tmp_path), interval=0.001)
+    profiler.start("train: train_model([x,y]) -> [model]")
+    busy_worker(0.05)
+    filepath = profiler.stop("train: train_model([x,y]) -> [model]", "run_1")
+
+    assert filepath.parent == tmp_path / "run_1"
+    assert filepath.suffix == ".collapsed"
+    assert "[" not in filepath.name and " " not in filepath.name
+    assert "busy_worker (" in filepath.read_text()
+    assert profiler.stop("train: train_model([x,y]) -> [model]", "run_1") is None
@@ -0,0 +1,120 @@
+"""
+Tests for the local prediction server, run entirely on localhost
+"""
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from minipro.serve import create_server, validate_rows
+
+# Columns of the shared clouds_x fixture
+COLUMNS = ["re_liq", "ctt", "cape", "month"]
+
+
+@pytest.fixture
+def server(model):
+    server = create_server(model, COLUMNS, port=0, max_latency_ms=20)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, path, payload=None):
+    url = "http://127.0.0.1:%d%s" % (server.server_address[1], path)
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    with urllib.request.urlopen(url, data=data) as response:
+        return json.loads(response.read())
+
+
+def test_validate_rows_reorders_instances():
+    rows = validate_rows(
+        {"instances": [{"month": 4, "cape": 3, "re_liq": 1, "ctt": 2}]}, COLUMNS
+    )
+    np.testing.assert_array_equal(rows, [[1.0, 2.0, 3.0, 4.0]])
+
+
+def test_validate_rows_rejects_wrong_width():
+    with pytest.raises(ValueError):
+        validate_rows({"rows": [[1.0, 2.0]]}, COLUMNS)
+
+
+def test_concurrent_requests_are_batched(server, model):
+    rng = np.random.default_rng(1)
+    rows = rng.normal(size=(64, len(COLUMNS)))
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        responses = list(
+            executor.map(
+                lambda row: _request(server, "/predict", {"rows": [row.tolist()]}),
+                rows,
+            )
+        )
+    preds = np.array([response["predictions"][0] for response in responses])
+    expected = model.predict(pd.DataFrame(rows, columns=COLUMNS))
+    np.testing.assert_allclose(preds, expected, rtol=1e-6)
+
+    metrics = _request(server, "/metrics")
+    assert metrics["requests"] == 64
+    assert metrics["batches"] < 64
+    assert metrics["latency_p99_ms"] >= metrics["latency_p50_ms"] > 0
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"instances": [{"cape": 1.0}]},
+        5,
+        [[1.0, 2.0, 3.0]],
+        {"instances": [1.0]},
+        {"instances": {"cape": 1.0}},
+        {"rows": [1.0, 2.0, 3.0]},
+        {"rows": 5},
+    ],
+)
+def test_invalid_request_returns_400(server, payload):
+    with pytest.raises(urllib.error.HTTPError) as exc_info:
+        _request(server, "/predict", payload)
+    assert exc_info.value.code == 400
+    assert _request(server, "/metrics")["errors"] == 1
+
+
+def test_server_close_stops_the_batcher(model):
+    server = create_server(model, COLUMNS, port=0)
+    thread = server.batcher._thread  # pylint: disable=protected-access
+    rows = np.zeros((2, len(COLUMNS)))
+    assert len(server.batcher.predict(rows)["predictions"]) == 2
+    server.server_close()
+    assert not thread.is_alive()
+    with pytest.raises(RuntimeError, match="closed"):
+        server.batcher.predict(rows)
+
+
+def test_quantiles_are_served_with_predictions(clouds_x, model):
+    quantile_model = xgb.XGBRegressor(
+        n_estimators=10,
+        max_depth=3,
+        objective="reg:quantileerror",
+        quantile_alpha=[0.1, 0.5, 0.9],
+    ).fit(clouds_x, clouds_x["ctt"])
+    server = create_server(model, COLUMNS, port=0, quantile_model=quantile_model)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        rows = clouds_x.iloc[:4].to_numpy()
+        response = _request(server, "/predict", {"rows": rows.tolist()})
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert response["quantile_levels"] == pytest.approx([0.1, 0.5, 0.9])
+    np.testing.assert_allclose(
+        response["quantiles"], quantile_model.predict(clouds_x.iloc[:4]), rtol=1e-6
+    )
+    assert len(response["predictions"]) == 4